@@ -0,0 +1,207 @@
+import csv
+import os
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from csr_graph import CSRGraph
+from landmarks import Landmarks
+
+# graph and landmarks attached to shared memory in each worker process
+_worker_graph = None
+_worker_landmarks = None
+_worker_blocks = None
+
+
+def load_queries(file):
+	"""Loads (start, goal) node id pairs from a csv file, skipping # comments.
+
+	Parameters
+	----------
+	file : str
+		path to csv file with rows of the form start,goal
+	"""
+
+	with open(file, 'r') as query_file:
+		return [(row[0].strip(), row[1].strip()) for row in csv.reader(query_file) if row and row[0][0] != '#']
+
+
+def share_arrays(arrays):
+	"""Copies named arrays into shared memory blocks.
+
+	Parameters
+	----------
+	arrays : dict of str -> array
+		arrays to publish to worker processes
+
+	Returns
+	-------
+	blocks : list of SharedMemory
+		shared memory blocks owned by the caller, close and unlink when done
+	spec : dict of str -> (str, tuple, str)
+		block name, shape and dtype of each array, passed to attach_arrays
+	"""
+
+	blocks, spec = [], {}
+	for name, array in arrays.items():
+		# zero-size blocks are not allowed
+		block = SharedMemory(create=True, size=max(array.nbytes, 1))
+		np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+		blocks.append(block)
+		spec[name] = (block.name, array.shape, array.dtype.str)
+	return blocks, spec
+
+
+def attach_arrays(spec):
+	"""Wraps shared memory blocks created by share_arrays as arrays without copying.
+
+	Parameters
+	----------
+	spec : dict of str -> (str, tuple, str)
+		block name, shape and dtype of each array
+
+	Returns
+	-------
+	arrays : dict of str -> array
+		arrays viewing the shared blocks
+	blocks : list of SharedMemory
+		attached blocks, must stay referenced while the arrays are in use
+	"""
+
+	blocks, arrays = [], {}
+	for name, (block_name, shape, dtype) in spec.items():
+		block = SharedMemory(name=block_name)
+		blocks.append(block)
+		arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+	return arrays, blocks
+
+
+def share_graph(graph):
+	"""Copies the arrays of a CSRGraph into shared memory blocks, see share_arrays."""
+	return share_arrays(graph.arrays())
+
+
+def attach_graph(spec):
+	"""Wraps shared memory blocks created by share_graph as a CSRGraph without copying.
+
+	Returns
+	-------
+	graph : CSRGraph
+		graph viewing the shared arrays
+	blocks : list of SharedMemory
+		attached blocks, must stay referenced while the graph is in use
+	"""
+	arrays, blocks = attach_arrays(spec)
+	return CSRGraph.from_arrays(arrays), blocks
+
+
+def _release(blocks):
+	"""Closes and unlinks shared memory blocks owned by the caller"""
+	for block in blocks:
+		block.close()
+		block.unlink()
+
+
+def _init_worker(spec, landmark_spec=None):
+	"""Attaches the shared graph and landmarks once per worker process"""
+	global _worker_graph, _worker_landmarks, _worker_blocks
+	_worker_graph, _worker_blocks = attach_graph(spec)
+	_worker_landmarks = None
+	if landmark_spec is not None:
+		arrays, blocks = attach_arrays(landmark_spec)
+		_worker_landmarks = Landmarks.from_arrays(arrays)
+		_worker_blocks += blocks
+
+
+def _solve(queries):
+	"""Runs A* for a chunk of (start, goal) id pairs in a worker process"""
+	graph = _worker_graph
+	paths = []
+	for start, goal in queries:
+		goal_row = graph.index(goal)
+		h, fill = (None, None) if _worker_landmarks is None else _worker_landmarks.heuristic(goal_row)
+		rows, _ = graph.astar(graph.index(start), goal_row, h, fill)
+		paths.append([str(i) for i in graph.ids[rows].tolist()])
+	return paths
+
+
+def _dijkstra(source):
+	"""Runs Dijkstra from one row in a worker process"""
+	return _worker_graph.dijkstra(source)
+
+
+def dijkstra_batch(graph, sources, workers=None):
+	"""Gets the cheapest path cost from each source row to every row across worker processes.
+
+	Parameters
+	----------
+	graph : CSRGraph
+		graph to search
+	sources : list of int
+		row indices to search from
+	workers : int
+		number of worker processes, defaults to the number of CPUs
+
+	Returns
+	-------
+	dists : list of float64 array
+		cost from each source to each row, inf where unreachable
+	"""
+
+	if not sources:
+		return []
+
+	workers = min(workers or os.cpu_count(), len(sources))
+	blocks, spec = share_graph(graph)
+	try:
+		with Pool(workers, initializer=_init_worker, initargs=(spec,)) as pool:
+			return pool.map(_dijkstra, sources, chunksize=1)
+	finally:
+		_release(blocks)
+
+
+def plan_batch(graph, queries, workers=None, chunksize=None, landmarks=None):
+	"""Plans optimal paths for a batch of start/goal pairs across worker processes.
+
+	The graph is published once through shared memory, so workers read the same
+	arrays instead of each holding a copy.
+
+	Parameters
+	----------
+	graph : CSRGraph
+		graph to plan on
+	queries : list of (str, str)
+		(start, goal) node id pairs
+	workers : int
+		number of worker processes, defaults to the number of CPUs
+	chunksize : int
+		number of queries sent to a worker at a time, by default sized so
+		each worker gets about four chunks (at most 64 queries each)
+	landmarks : Landmarks
+		if given, shared with the workers and used as the A* heuristic
+
+	Returns
+	-------
+	paths : list of list of str
+		optimal path for each pair in input order, empty if no path exists
+	"""
+
+	if not queries:
+		return []
+
+	workers = workers or os.cpu_count()
+	chunksize = chunksize or max(1, min(64, len(queries) // (4 * workers)))
+	chunks = [queries[i:i+chunksize] for i in range(0, len(queries), chunksize)]
+
+	blocks, spec = share_graph(graph)
+	landmark_spec = None
+	if landmarks is not None:
+		landmark_blocks, landmark_spec = share_arrays(landmarks.arrays())
+		blocks += landmark_blocks
+	try:
+		with Pool(workers, initializer=_init_worker, initargs=(spec, landmark_spec)) as pool:
+			paths = [p for chunk in pool.imap(_solve, chunks) for p in chunk]
+	finally:
+		_release(blocks)
+	return paths
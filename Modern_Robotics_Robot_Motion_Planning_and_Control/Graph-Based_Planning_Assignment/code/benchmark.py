@@ -0,0 +1,348 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from math import sqrt
+
+import numpy as np
+
+from planner import Planner
+from csr_graph import CSRGraph
+from incremental import IncrementalPlanner
+
+
+def write_grid_graph(dir_, side):
+	"""Writes a side x side 4-connected grid graph as nodes.csv and edges.csv.
+
+	Node ids run 1 through side*side in row-major order. The heuristic column is
+	the euclidean distance to the last node, which is the goal used by the benchmarks.
+
+	Parameters
+	----------
+	dir_ : str
+		directory to write the csv files to (ending in /)
+	side : int
+		number of nodes along each side of the grid
+	"""
+
+	with open(dir_ + 'nodes.csv', 'w') as node_file:
+		node_file.write("# ID,x,y,heuristic-cost-to-go\n")
+		for i in range(side):
+			for j in range(side):
+				h = sqrt((side - 1 - i)**2 + (side - 1 - j)**2)
+				node_file.write(f"{i*side + j + 1},{j},{i},{h}\n")
+
+	with open(dir_ + 'edges.csv', 'w') as edge_file:
+		edge_file.write("# ID1,ID2,cost\n")
+		for i in range(side):
+			for j in range(side):
+				id_ = i*side + j + 1
+				if j + 1 < side:
+					edge_file.write(f"{id_},{id_ + 1},1.0\n")
+				if i + 1 < side:
+					edge_file.write(f"{id_},{id_ + side},1.0\n")
+
+
+def zero_heuristic(planner):
+	"""Sets the heuristic of every node in a Planner to zero."""
+	if planner.graph is not None:
+		planner.graph.h[:] = 0.0
+	for n in planner.nodes.values():
+		n.h = 0.0
+
+
+def bench_astar(sides, backend):
+	"""Reports graph memory and A* expansions per second on grid graphs of increasing size.
+
+	Parameters
+	----------
+	sides : list of int
+		grid side lengths to benchmark
+	backend : str
+		Planner backend to benchmark ('dict' or 'csr')
+	"""
+
+	print(f"{'nodes':>10} {'memory [MB]':>12} {'expanded':>10} {'search [s]':>12} {'expansions/s':>14}")
+	for side in sides:
+		with tempfile.TemporaryDirectory() as tmp:
+			write_grid_graph(tmp + os.sep, side)
+			tracemalloc.start()
+			planner = Planner(tmp + os.sep, backend=backend)
+			memory = tracemalloc.get_traced_memory()[0] / 1e6
+			tracemalloc.stop()
+
+		# zero heuristic forces a full Dijkstra sweep, so every node is expanded
+		zero_heuristic(planner)
+
+		start = time.perf_counter()
+		planner.plan_astar('1', str(side*side))
+		elapsed = time.perf_counter() - start
+		expanded = planner.stats.expanded
+
+		print(f"{side*side:>10} {memory:>12.2f} {expanded:>10} {elapsed:>12.4f} {expanded/elapsed:>14.0f}")
+
+
+def bench_many(sides, backend, n_queries):
+	"""Reports queries per second answered by Planner.plan_many on a loaded graph.
+
+	Parameters
+	----------
+	sides : list of int
+		grid side lengths to benchmark
+	backend : str
+		Planner backend to benchmark ('dict' or 'csr')
+	n_queries : int
+		number of random start/goal pairs per graph
+	"""
+
+	print(f"{'nodes':>10} {'queries':>10} {'search [s]':>12} {'queries/s':>12}")
+	for side in sides:
+		with tempfile.TemporaryDirectory() as tmp:
+			write_grid_graph(tmp + os.sep, side)
+			planner = Planner(tmp + os.sep, backend=backend)
+
+		# the csv heuristic only holds for the last node, so drop it for random goals
+		zero_heuristic(planner)
+
+		rng = random.Random(0)
+		queries = [(str(rng.randint(1, side*side)), str(rng.randint(1, side*side))) for _ in range(n_queries)]
+
+		start = time.perf_counter()
+		planner.plan_many(queries)
+		elapsed = time.perf_counter() - start
+
+		print(f"{side*side:>10} {n_queries:>10} {elapsed:>12.4f} {n_queries/elapsed:>12.1f}")
+
+
+def bench_load(sides):
+	"""Reports graph load time for the dict backend, the csv parser and the binary cache.
+
+	Parameters
+	----------
+	sides : list of int
+		grid side lengths to benchmark
+	"""
+
+	print(f"{'nodes':>10} {'dict [s]':>10} {'csv [s]':>10} {'cold [s]':>10} {'cached [s]':>11}")
+	for side in sides:
+		with tempfile.TemporaryDirectory() as tmp:
+			dir_ = tmp + os.sep
+			write_grid_graph(dir_, side)
+
+			times = []
+			for load in (lambda: Planner(dir_),
+						 lambda: CSRGraph.load(dir_, cache=False),
+						 lambda: CSRGraph.load(dir_),
+						 lambda: CSRGraph.load(dir_)):
+				start = time.perf_counter()
+				load()
+				times.append(time.perf_counter() - start)
+
+		print(f"{side*side:>10} {times[0]:>10.4f} {times[1]:>10.4f} {times[2]:>10.4f} {times[3]:>11.5f}")
+
+
+def bench_bidirectional(sides, backend, n_queries):
+	"""Compares node expansions and latency of bidirectional A* against A*.
+
+	Random start/goal pairs are used, so the csv heuristic (which only holds for
+	the last node) is zeroed for A*, while bidirectional A* uses its own
+	euclidean potentials.
+
+	Parameters
+	----------
+	sides : list of int
+		grid side lengths to benchmark
+	backend : str
+		Planner backend to benchmark ('dict' or 'csr')
+	n_queries : int
+		number of random start/goal pairs per graph
+	"""
+
+	print(f"{'nodes':>10} {'A* expanded':>12} {'A* [ms]':>10} {'bidir expanded':>15} {'bidir [ms]':>11}")
+	for side in sides:
+		with tempfile.TemporaryDirectory() as tmp:
+			write_grid_graph(tmp + os.sep, side)
+			planner = Planner(tmp + os.sep, backend=backend)
+		zero_heuristic(planner)
+
+		rng = random.Random(0)
+		queries = [(str(rng.randint(1, side*side)), str(rng.randint(1, side*side))) for _ in range(n_queries)]
+
+		results = []
+		for search in (planner._search, planner._search_bidirectional):
+			expanded, elapsed = 0, 0.0
+			for s, g in queries:
+				start = time.perf_counter()
+				_, stats = search(s, g)
+				elapsed += time.perf_counter() - start
+				expanded += stats.expanded
+			results += [expanded / n_queries, 1000 * elapsed / n_queries]
+
+		print(f"{side*side:>10} {results[0]:>12.0f} {results[1]:>10.2f} {results[2]:>15.0f} {results[3]:>11.2f}")
+
+
+def bench_landmarks(sides, n_queries, k):
+	"""Compares A* expansions with the csv heuristic zeroed against landmark (ALT) bounds.
+
+	Parameters
+	----------
+	sides : list of int
+		grid side lengths to benchmark
+	n_queries : int
+		number of random start/goal pairs per graph
+	k : int
+		number of landmarks
+	"""
+
+	def table(landmarks, goal):
+		"""Gets the bounds of every row up front, the K x n way the heuristic was first computed"""
+		with np.errstate(invalid='ignore'):
+			diff = np.abs(landmarks.dist[:, goal:goal+1] - landmarks.dist)
+		diff[np.isnan(diff)] = 0.0
+		return np.maximum(diff.max(axis=0).astype(np.float64) - float(landmarks.slack), 0.0), None
+
+	print(f"{'nodes':>10} {'build [s]':>10} {'A* expanded':>12} {'A* [ms]':>10} {'ALT expanded':>13} {'ALT [ms]':>10} {'table [ms]':>11}")
+	for side in sides:
+		with tempfile.TemporaryDirectory() as tmp:
+			write_grid_graph(tmp + os.sep, side)
+			planner = Planner(tmp + os.sep, backend='csr')
+			zero_heuristic(planner)
+
+			start = time.perf_counter()
+			planner.use_landmarks(tmp + os.sep + 'landmarks.npz', k)
+			build = time.perf_counter() - start
+		landmarks, graph = planner.landmarks, planner.graph
+
+		rng = random.Random(0)
+		queries = [(rng.randrange(side*side), rng.randrange(side*side)) for _ in range(n_queries)]
+
+		# wall time per query, including getting the bounds: none, filled as the search reaches rows, or all up front
+		results = []
+		for heuristic in (lambda goal: (None, None), landmarks.heuristic, lambda goal: table(landmarks, goal)):
+			expanded, elapsed = 0, 0.0
+			for s, g in queries:
+				start = time.perf_counter()
+				_, stats = graph.astar(s, g, *heuristic(g))
+				elapsed += time.perf_counter() - start
+				expanded += stats.expanded
+			results += [expanded / n_queries, 1000 * elapsed / n_queries]
+
+		print(f"{side*side:>10} {build:>10.3f} {results[0]:>12.0f} {results[1]:>10.2f} {results[2]:>13.0f} {results[3]:>10.2f} {results[5]:>11.2f}")
+
+
+def bench_contraction(sides, n_queries):
+	"""Reports contraction hierarchy build time and query latency against A*.
+
+	Parameters
+	----------
+	sides : list of int
+		grid side lengths to benchmark
+	n_queries : int
+		number of random start/goal pairs per graph
+	"""
+
+	print(f"{'nodes':>10} {'build [s]':>10} {'shortcuts':>10} {'A* [ms]':>10} {'CH expanded':>12} {'CH [ms]':>10}")
+	for side in sides:
+		with tempfile.TemporaryDirectory() as tmp:
+			write_grid_graph(tmp + os.sep, side)
+			planner = Planner(tmp + os.sep, backend='csr')
+		zero_heuristic(planner)
+
+		start = time.perf_counter()
+		planner.use_contraction()
+		build = time.perf_counter() - start
+		shortcuts = int((planner.hierarchy.middle >= 0).sum())
+
+		rng = random.Random(0)
+		queries = [(rng.randrange(side*side), rng.randrange(side*side)) for _ in range(n_queries)]
+
+		start = time.perf_counter()
+		for s, g in queries:
+			planner.graph.astar(s, g)
+		astar = 1000 * (time.perf_counter() - start) / n_queries
+
+		expanded = 0
+		start = time.perf_counter()
+		for s, g in queries:
+			expanded += planner.hierarchy.query(s, g)[1].expanded
+		ch = 1000 * (time.perf_counter() - start) / n_queries
+
+		print(f"{side*side:>10} {build:>10.2f} {shortcuts:>10} {astar:>10.2f} {expanded/n_queries:>12.0f} {ch:>10.3f}")
+
+
+def bench_incremental(sides, n_changes):
+	"""Compares D* Lite replan latency against A* from scratch after small local edge changes.
+
+	Each change raises the cost of a random edge on the current path, then
+	the robot steps one node along the new path.
+
+	Parameters
+	----------
+	sides : list of int
+		grid side lengths to benchmark
+	n_changes : int
+		number of edge changes per graph
+	"""
+
+	print(f"{'nodes':>10} {'initial [ms]':>13} {'A* [ms]':>10} {'replan [ms]':>12} {'replan expanded':>16}")
+	for side in sides:
+		with tempfile.TemporaryDirectory() as tmp:
+			write_grid_graph(tmp + os.sep, side)
+			planner = IncrementalPlanner(tmp + os.sep)
+		goal = str(side*side)
+
+		start = time.perf_counter()
+		planner.plan('1', goal)
+		initial = 1000 * (time.perf_counter() - start)
+
+		rng = random.Random(0)
+		astar, replan, expanded = 0.0, 0.0, 0
+		for _ in range(n_changes):
+			if len(planner.path) < 3:
+				break
+			i = rng.randrange(1, len(planner.path) - 1)
+			a, b = planner.path[i], planner.path[i+1]
+			planner.update_edge(a, b, planner.nodes[a].neighbors[b] * 5)
+
+			start = time.perf_counter()
+			planner.replan()
+			replan += time.perf_counter() - start
+			expanded += planner.stats.expanded
+
+			start = time.perf_counter()
+			planner._search(planner.start, goal)
+			astar += time.perf_counter() - start
+
+			planner.move_start(planner.path[1])
+
+		print(f"{side*side:>10} {initial:>13.2f} {1000*astar/n_changes:>10.2f} "
+			  f"{1000*replan/n_changes:>12.3f} {expanded/n_changes:>16.1f}")
+
+
+if __name__ == "__main__":
+
+	# parse command line args
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--sides", nargs="+", type=int, default=[50, 100, 200, 400])
+	parser.add_argument("--backend", choices=["dict", "csr"], default="dict")
+	parser.add_argument("--suite", choices=["astar", "many", "load", "bidirectional", "landmarks", "ch", "incremental"], default="astar")
+	parser.add_argument("--queries", type=int, default=100)
+	parser.add_argument("--landmarks", type=int, default=8)
+	args = parser.parse_args()
+
+	if args.suite == "astar":
+		bench_astar(args.sides, args.backend)
+	elif args.suite == "many":
+		bench_many(args.sides, args.backend, args.queries)
+	elif args.suite == "load":
+		bench_load(args.sides)
+	elif args.suite == "bidirectional":
+		bench_bidirectional(args.sides, args.backend, args.queries)
+	elif args.suite == "landmarks":
+		bench_landmarks(args.sides, args.queries, args.landmarks)
+	elif args.suite == "ch":
+		bench_contraction(args.sides, args.queries)
+	elif args.suite == "incremental":
+		bench_incremental(args.sides, args.queries)
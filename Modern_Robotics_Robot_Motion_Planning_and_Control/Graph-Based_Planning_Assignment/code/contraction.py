@@ -0,0 +1,291 @@
+from heapq import heappush, heappop, heapify
+from math import inf
+
+import numpy as np
+
+from stats import SearchStats
+
+
+class ContractionHierarchy():
+	"""Contraction hierarchy (CH) for fast shortest-path queries on a static CSRGraph.
+
+	Nodes are contracted one at a time in order of importance. Whenever removing
+	a node would lengthen the shortest path between two of its neighbors, a
+	shortcut edge remembering the contracted (middle) node is added between them.
+	Queries then only follow edges towards more important nodes from both ends,
+	and shortcuts are unpacked through their middle nodes afterwards.
+
+	...
+
+	Attributes
+	----------
+	rank : int64 array
+		contraction order of each row, higher is more important
+	offsets : int64 array
+		start of each row's upward edge range, length n_nodes + 1
+	indices : int32 array
+		upward neighbor row indices
+	costs : float64 array
+		cost of each upward edge
+	middle : int32 array
+		contracted row bridged by each upward edge, -1 for edges of the original graph
+
+	Methods
+	-------
+	build(graph, witness_limit)
+		contracts every node of a graph to build the hierarchy
+	query(start, goal)
+		gets the optimal path between two rows as original graph rows
+	save(file), load(file)
+		stores or reads the hierarchy as a .npz file
+	"""
+
+	# arrays that fully describe the hierarchy, used to store it
+	ARRAYS = ('rank', 'offsets', 'indices', 'costs', 'middle')
+
+	def __init__(self, rank, up):
+		"""
+		Parameters
+		----------
+		rank : int array
+			contraction order of each row
+		up : list of dict
+			for each row, dict of upward neighbor row -> (cost, middle row)
+		"""
+
+		self.rank = np.asarray(rank, dtype=np.int64)
+		self.offsets = np.zeros(len(up) + 1, dtype=np.int64)
+		np.cumsum([len(edges) for edges in up], out=self.offsets[1:])
+		self.indices = np.array([n for edges in up for n in edges], dtype=np.int32)
+		self.costs = np.array([c for edges in up for c, _ in edges.values()], dtype=np.float64)
+		self.middle = np.array([m for edges in up for _, m in edges.values()], dtype=np.int32)
+
+	@classmethod
+	def from_arrays(cls, arrays):
+		"""Wraps existing arrays as a hierarchy without copying them"""
+		ch = cls.__new__(cls)
+		for name in cls.ARRAYS:
+			setattr(ch, name, arrays[name])
+		return ch
+
+	def arrays(self):
+		"""Gets the named arrays that fully describe the hierarchy"""
+		return {name: getattr(self, name) for name in self.ARRAYS}
+
+	@staticmethod
+	def _witness(adj, source, skip, limit, settle_limit):
+		"""Gets path costs from source in the remaining graph without passing through skip.
+
+		The search stops past cost limit or after settle_limit nodes, so missing
+		entries only mean no witness was found, not that none exists.
+		"""
+
+		dist = {source: 0.0}
+		openSet = [(0.0, source)]
+		settled = 0
+		while openSet and settled < settle_limit:
+			d, c = heappop(openSet)
+			if d > dist[c]:
+				continue
+			if d > limit:
+				break
+			settled += 1
+			for n, (cost, _) in adj[c].items():
+				temp_score = d + cost
+				if n != skip and temp_score < dist.get(n, inf):
+					dist[n] = temp_score
+					heappush(openSet, (temp_score, n))
+		return dist
+
+	@classmethod
+	def _shortcuts(cls, adj, v, settle_limit):
+		"""Gets the shortcuts needed to contract v as (u, w, cost) triples"""
+		neighbors = list(adj[v].items())
+		shortcuts = []
+		for i, (u, (cost_u, _)) in enumerate(neighbors[:-1]):
+			targets = neighbors[i+1:]
+			limit = cost_u + max(cost_w for _, (cost_w, _) in targets)
+			dist = cls._witness(adj, u, v, limit, settle_limit)
+			for w, (cost_w, _) in targets:
+				if dist.get(w, inf) > cost_u + cost_w:
+					shortcuts.append((u, w, cost_u + cost_w))
+		return shortcuts
+
+	@classmethod
+	def build(cls, graph, witness_limit=64):
+		"""Contracts every node of a graph to build the hierarchy.
+
+		Nodes are ordered by edge difference (shortcuts added minus edges removed)
+		plus the number of already contracted neighbors, with priorities updated
+		lazily when a node reaches the top of the queue.
+
+		Parameters
+		----------
+		graph : CSRGraph
+			graph to preprocess
+		witness_limit : int
+			nodes settled per witness search, lower builds faster but adds more shortcuts
+		"""
+
+		n_nodes = graph.n_nodes
+		offsets, indices, costs = graph.offsets.tolist(), graph.indices.tolist(), graph.costs.tolist()
+
+		# remaining graph as dicts of neighbor -> (cost, middle), keeping the cheapest parallel edge
+		adj = [dict() for _ in range(n_nodes)]
+		for v in range(n_nodes):
+			for i in range(offsets[v], offsets[v+1]):
+				n = indices[i]
+				if n != v and costs[i] < adj[v].get(n, (inf,))[0]:
+					adj[v][n] = (costs[i], -1)
+
+		deleted = [0] * n_nodes
+
+		queue = [(len(cls._shortcuts(adj, v, witness_limit)) - len(adj[v]), v) for v in range(n_nodes)]
+		heapify(queue)
+
+		rank = [0] * n_nodes
+		up = [None] * n_nodes
+		level = 0
+		while queue:
+			_, v = heappop(queue)
+
+			# lazy update, put v back if it is no longer the least important node
+			shortcuts = cls._shortcuts(adj, v, witness_limit)
+			p = len(shortcuts) - len(adj[v]) + deleted[v]
+			if queue and p > queue[0][0]:
+				heappush(queue, (p, v))
+				continue
+
+			for u, w, cost in shortcuts:
+				if cost < adj[u].get(w, (inf,))[0]:
+					adj[u][w] = (cost, v)
+					adj[w][u] = (cost, v)
+
+			# every remaining neighbor is contracted later, so these edges all point upward
+			up[v] = adj[v]
+			rank[v] = level
+			level += 1
+			for n in adj[v]:
+				del adj[n][v]
+				deleted[n] += 1
+			adj[v] = dict()
+
+		return cls(rank, up)
+
+	def _upward(self, c):
+		"""Gets (neighbor, cost) pairs of the upward edges of row c"""
+		lo, hi = self.offsets[c], self.offsets[c+1]
+		return zip(self.indices[lo:hi].tolist(), self.costs[lo:hi].tolist())
+
+	def _unpack(self, a, b):
+		"""Expands the upward edge between rows a and b into original graph rows (a -> b)"""
+		path = [a]
+		stack = [b]
+		while stack:
+			b = stack[-1]
+			low, high = (a, b) if self.rank[a] < self.rank[b] else (b, a)
+			lo, hi = self.offsets[low], self.offsets[low+1]
+			m = int(self.middle[lo + int(np.flatnonzero(self.indices[lo:hi] == high)[0])])
+			if m < 0:
+				# original edge, step along it
+				path.append(b)
+				a = stack.pop()
+			else:
+				# shortcut, first expand a -> m
+				stack.append(m)
+		return path
+
+	def query(self, start, goal):
+		"""Plans an optimal path between two rows with an upward search from both ends.
+
+		Parameters
+		----------
+		start : int
+			row index of the starting node
+		goal : int
+			row index of the goal node
+
+		Returns
+		-------
+		path : list of int
+			original graph rows from start to goal, empty if no path exists
+		stats : SearchStats
+			search counters of both directions and path cost
+		"""
+
+		dists = ({start: 0.0}, {goal: 0.0})
+		parents = ({start: -1}, {goal: -1})
+		openSets = ([(0.0, start)], [(0.0, goal)])
+		done = [set(), set()]
+		best, meet = inf, -1
+		expanded = 0
+		generated = 2
+		peak = 2
+
+		while (openSets[0] and openSets[0][0][0] < best) or (openSets[1] and openSets[1][0][0] < best):
+			if len(openSets[0]) + len(openSets[1]) > peak:
+				peak = len(openSets[0]) + len(openSets[1])
+
+			# expand the direction with the smaller open key
+			d = 0 if openSets[0] and (not openSets[1] or openSets[0][0][0] <= openSets[1][0][0]) else 1
+
+			g, c = heappop(openSets[d])
+			if c in done[d]:
+				continue
+			done[d].add(c)
+			expanded += 1
+
+			if c in dists[1 - d] and g + dists[1 - d][c] < best:
+				best = g + dists[1 - d][c]
+				meet = c
+
+			for n, cost in self._upward(c):
+				temp_score = g + cost
+				if temp_score < dists[d].get(n, inf):
+					dists[d][n] = temp_score
+					parents[d][n] = c
+					generated += 1
+					heappush(openSets[d], (temp_score, n))
+
+		stats = SearchStats(expanded, generated, peak, best)
+		if meet < 0:
+			return [], stats
+
+		# chain of hierarchy nodes start -> meet -> goal
+		chain = []
+		c = meet
+		while c >= 0:
+			chain.append(c)
+			c = parents[0][c]
+		chain.reverse()
+		c = parents[1][meet]
+		while c >= 0:
+			chain.append(c)
+			c = parents[1][c]
+
+		path = [start]
+		for a, b in zip(chain, chain[1:]):
+			path += self._unpack(a, b)[1:]
+		return path, stats
+
+	def save(self, file):
+		"""Saves the hierarchy as a .npz file
+
+		Parameters
+		----------
+		file : str
+			path of the file to write
+		"""
+		np.savez(file, **self.arrays())
+
+	@classmethod
+	def load(cls, file):
+		"""Loads a hierarchy saved by save
+
+		Parameters
+		----------
+		file : str
+			path of the file to read
+		"""
+		with np.load(file) as data:
+			return cls.from_arrays({name: data[name] for name in cls.ARRAYS})
@@ -0,0 +1,475 @@
+import os
+from heapq import heappush, heappop
+from math import inf, hypot
+
+import numpy as np
+
+from stats import SearchStats
+
+
+class CSRGraph():
+	"""Compact array-backed graph stored in compressed sparse row (CSR) form.
+
+	The neighbors of node i are indices[offsets[i]:offsets[i+1]] with matching
+	edge costs in costs[offsets[i]:offsets[i+1]]. Nodes are addressed internally
+	by their row index, node ids from nodes.csv are only used at the boundary.
+
+	...
+
+	Attributes
+	----------
+	ids : int64 array
+		node id of each row
+	x, y : float64 array
+		location of each node
+	h : float64 array
+		heuristic cost-to-go of each node
+	offsets : int64 array
+		start of each node's neighbor range, length n_nodes + 1
+	indices : int32 array
+		neighbor row indices
+	costs : float64 array
+		edge cost to each neighbor in indices
+
+	Methods
+	-------
+	from_csv(path)
+		builds a graph from nodes.csv and edges.csv in the specified directory
+	load(path, cache)
+		loads a graph from a binary snapshot, building the snapshot from the csv files if stale
+	save(dir_, key)
+		saves the graph arrays as .npy files that can be memory-mapped
+	from_arrays(arrays)
+		wraps existing arrays (e.g. in shared memory) as a graph without copying
+	arrays()
+		gets the named arrays that fully describe the graph
+	index(id_)
+		gets the row index of a node id
+	astar(start, goal, h, fill)
+		runs A* between two row indices and returns the path as row indices
+	dijkstra(source)
+		gets the cheapest path cost from one row to every row
+	bidirectional(start, goal)
+		runs bidirectional A* between two row indices
+	"""
+
+	# arrays that fully describe a graph, used to share or store it
+	ARRAYS = ('ids', 'x', 'y', 'h', 'offsets', 'indices', 'costs', '_order', '_sorted_ids')
+
+	# directory inside the data directory holding the binary snapshot
+	CACHE_DIR = 'graph_cache/'
+
+	def __init__(self, ids, x, y, h, id1, id2, cost):
+		"""
+		Parameters
+		----------
+		ids : int array
+			node id of each row
+		x, y, h : float arrays
+			location and heuristic cost-to-go of each node
+		id1, id2 : int arrays
+			node ids of the endpoints of each undirected edge
+		cost : float array
+			cost of each undirected edge
+		"""
+
+		self.ids 	= np.asarray(ids, dtype=np.int64)
+		self.x 		= np.asarray(x, dtype=np.float64)
+		self.y 		= np.asarray(y, dtype=np.float64)
+		self.h 		= np.asarray(h, dtype=np.float64)
+
+		# sorted copy of ids for id -> row lookups
+		self._order = np.argsort(self.ids, kind='stable')
+		self._sorted_ids = self.ids[self._order]
+
+		# store both directions of every edge, grouped by source row
+		src = self._rows(id1)
+		dst = self._rows(id2)
+		cost = np.asarray(cost, dtype=np.float64)
+		both_src = np.stack((src, dst), axis=1).ravel()
+		both_dst = np.stack((dst, src), axis=1).ravel()
+		both_cost = np.repeat(cost, 2)
+		order = np.argsort(both_src, kind='stable')
+
+		self.indices = both_dst[order].astype(np.int32)
+		self.costs = both_cost[order]
+		self.offsets = np.zeros(len(self.ids) + 1, dtype=np.int64)
+		np.cumsum(np.bincount(both_src, minlength=len(self.ids)), out=self.offsets[1:])
+
+		self._init_search_state()
+
+	@classmethod
+	def from_csv(cls, path):
+		"""Builds a graph from nodes.csv and edges.csv in the specified directory.
+
+		Both files are parsed in one vectorized pass each, lines beginning
+		with a # are treated as comments.
+
+		Parameters
+		----------
+		path : str
+			path to directory containing nodes.csv and edges.csv (ending in /)
+		"""
+
+		# load node data as rows of [ID, x, y, heuristic-cost-to-go]
+		# reshaped, as a file without data rows loads as shape (0, 1)
+		nodes = np.loadtxt(path + 'nodes.csv', delimiter=',', comments='#', ndmin=2).reshape(-1, 4)
+
+		# load edge data as rows of [ID1, ID2, cost]
+		edges = np.loadtxt(path + 'edges.csv', delimiter=',', comments='#', ndmin=2).reshape(-1, 3)
+
+		return cls(nodes[:, 0].astype(np.int64), nodes[:, 1], nodes[:, 2], nodes[:, 3],
+				   edges[:, 0].astype(np.int64), edges[:, 1].astype(np.int64), edges[:, 2])
+
+	@classmethod
+	def load(cls, path, cache=True):
+		"""Loads a graph, memory-mapping a binary snapshot of it when one is up to date.
+
+		On a cache miss the csv files are parsed and the snapshot is written to
+		CACHE_DIR inside the data directory. Snapshots are keyed on the size and
+		modification time of nodes.csv and edges.csv.
+
+		Parameters
+		----------
+		path : str
+			path to directory containing nodes.csv and edges.csv (ending in /)
+		cache : bool
+			if False, always parses the csv files and does not write a snapshot
+		"""
+
+		if not cache:
+			return cls.from_csv(path)
+
+		cache_dir = path + cls.CACHE_DIR
+		key = cls._source_key(path)
+
+		# memory-map snapshot if it was built from the current csv files
+		try:
+			with open(cache_dir + 'key.txt', 'r') as key_file:
+				if key_file.read() == key:
+					return cls.from_arrays({name: np.load(cache_dir + name + '.npy', mmap_mode='r')
+											for name in cls.ARRAYS})
+		except FileNotFoundError:
+			pass
+
+		graph = cls.from_csv(path)
+		graph.save(cache_dir, key)
+		return graph
+
+	@staticmethod
+	def _source_key(path):
+		"""Gets a key identifying the current contents of nodes.csv and edges.csv"""
+		stats = [os.stat(path + f) for f in ('nodes.csv', 'edges.csv')]
+		return ';'.join(f"{st.st_size}:{st.st_mtime_ns}" for st in stats)
+
+	def save(self, dir_, key=''):
+		"""Saves the graph arrays as .npy files that can be memory-mapped.
+
+		Parameters
+		----------
+		dir_ : str
+			directory to save the arrays to (ending in /), created if missing
+		key : str
+			key of the source files, written last so a partial snapshot is never used
+		"""
+
+		os.makedirs(dir_, exist_ok=True)
+		for name, array in self.arrays().items():
+			np.save(dir_ + name + '.npy', array)
+		with open(dir_ + 'key.txt', 'w') as key_file:
+			key_file.write(key)
+
+	@classmethod
+	def from_arrays(cls, arrays):
+		"""Wraps existing arrays as a graph without copying them.
+
+		Parameters
+		----------
+		arrays : dict of str -> array
+			arrays named as in ARRAYS, e.g. as returned by arrays()
+		"""
+
+		graph = cls.__new__(cls)
+		for name in cls.ARRAYS:
+			setattr(graph, name, arrays[name])
+		graph._init_search_state()
+		return graph
+
+	def arrays(self):
+		"""Gets the named arrays that fully describe the graph"""
+		return {name: getattr(self, name) for name in self.ARRAYS}
+
+	def _init_search_state(self):
+		"""Sets up reusable per-query search state, allocated on the first search"""
+		self._states = [None, None]
+		self._generation = 0
+		self._scale = None
+
+	def _state(self, side=0):
+		"""Gets reusable (gScore, parent, visited, closed) lists for one search direction.
+
+		Entries stamped with an older generation are treated as unvisited,
+		so nothing needs clearing between queries.
+		"""
+		if self._states[side] is None:
+			self._states[side] = ([inf] * self.n_nodes, [-1] * self.n_nodes,
+								  [0] * self.n_nodes, [0] * self.n_nodes)
+		return self._states[side]
+
+	def heuristic_scale(self):
+		"""Gets the largest k for which k times euclidean distance never exceeds an edge cost.
+
+		k times the euclidean distance to any node is then a consistent heuristic.
+		"""
+		if self._scale is None:
+			src = np.repeat(np.arange(self.n_nodes), np.diff(self.offsets))
+			length = np.hypot(self.x[src] - self.x[self.indices], self.y[src] - self.y[self.indices])
+			moving = length > 0
+			self._scale = float(max(0.0, np.min(self.costs[moving] / length[moving]))) if np.any(moving) else 0.0
+		return self._scale
+
+	@property
+	def n_nodes(self):
+		"""Number of nodes in the graph"""
+		return len(self.ids)
+
+	@property
+	def nbytes(self):
+		"""Memory used by the graph arrays in bytes"""
+		return sum(a.nbytes for a in self.arrays().values())
+
+	def _rows(self, ids):
+		"""Maps an array of node ids to row indices"""
+		ids = np.asarray(ids, dtype=np.int64)
+		pos = np.searchsorted(self._sorted_ids, ids)
+		pos = np.minimum(pos, len(self._sorted_ids) - 1)
+		if len(ids) and np.any(self._sorted_ids[pos] != ids):
+			raise KeyError(f"unknown node id(s): {ids[self._sorted_ids[pos] != ids][:5].tolist()}")
+		return self._order[pos]
+
+	def index(self, id_):
+		"""Gets the row index of a node id.
+
+		Parameters
+		----------
+		id_ : str or int
+			id of the node
+		"""
+		return int(self._rows([int(id_)])[0])
+
+	def astar(self, start, goal, h=None, fill=None):
+		"""Plans an optimal path between two rows using the A* algorithm.
+
+		Parameters
+		----------
+		start : int
+			row index of the starting node
+		goal : int
+			row index of the goal node
+		h : float64 array
+			heuristic cost-to-go of each row for this goal, defaults to the csv heuristic
+		fill : function
+			computes the entries of h that are nan, called with the row and returning its value
+
+		Returns
+		-------
+		path : list of int
+			row indices from start to goal, empty if no path exists
+		stats : SearchStats
+			search counters and path cost
+		"""
+
+		# memoryviews give zero-copy element access that is much cheaper than numpy indexing
+		offsets, indices = memoryview(self.offsets), memoryview(self.indices)
+		costs = memoryview(self.costs)
+		h = memoryview(self.h if h is None else np.ascontiguousarray(h, dtype=np.float64))
+
+		# search state is allocated once and reused across queries
+		gScore, parent, visited, closed = self._state()
+		self._generation += 1
+		gen = self._generation
+
+		gScore[start] = 0.0
+		parent[start] = -1
+		visited[start] = gen
+		count = 0
+		h_start = h[start]
+		if h_start != h_start:
+			h_start = fill(start)
+		openSet = [(h_start, count, start)]
+		expanded = 0
+		peak = 1
+
+		while openSet:
+			if len(openSet) > peak:
+				peak = len(openSet)
+			_, _, c = heappop(openSet)
+
+			# skip stale entries for nodes that were already expanded
+			if closed[c] == gen:
+				continue
+
+			if c == goal:
+				# walk parents back to the start
+				path = [c]
+				while parent[c] >= 0:
+					c = parent[c]
+					path.append(c)
+				return path[::-1], SearchStats(expanded, count + 1, peak, gScore[goal])
+
+			closed[c] = gen
+			expanded += 1
+			g = gScore[c]
+
+			for k in range(offsets[c], offsets[c+1]):
+				n = indices[k]
+				if visited[n] != gen:
+					visited[n] = gen
+					gScore[n] = inf
+				temp_score = g + costs[k]
+				if temp_score < gScore[n] and closed[n] != gen:
+					gScore[n] = temp_score
+					parent[n] = c
+					count += 1
+					h_n = h[n]
+					if h_n != h_n:
+						h_n = fill(n)
+					heappush(openSet, (temp_score + h_n, count, n))
+
+		return [], SearchStats(expanded, count + 1, peak)
+
+	def dijkstra(self, source):
+		"""Gets the cost of the cheapest path from one row to every row.
+
+		Parameters
+		----------
+		source : int
+			row index to search from
+
+		Returns
+		-------
+		dist : float64 array
+			cost from source to each row, inf where unreachable
+		"""
+
+		offsets, indices, costs = memoryview(self.offsets), memoryview(self.indices), memoryview(self.costs)
+		dist = [inf] * self.n_nodes
+		dist[source] = 0.0
+		openSet = [(0.0, source)]
+
+		while openSet:
+			d, c = heappop(openSet)
+			if d > dist[c]:
+				continue
+			for i in range(offsets[c], offsets[c+1]):
+				n = indices[i]
+				temp_score = d + costs[i]
+				if temp_score < dist[n]:
+					dist[n] = temp_score
+					heappush(openSet, (temp_score, n))
+
+		return np.array(dist)
+
+	def bidirectional(self, start, goal):
+		"""Plans an optimal path between two rows using bidirectional A*.
+
+		Both searches use the average of the scaled euclidean heuristics to the
+		goal and to the start as potentials, which are consistent in both
+		directions, so the search can stop once the two smallest open keys sum
+		to at least the best path found so far.
+
+		Parameters
+		----------
+		start : int
+			row index of the starting node
+		goal : int
+			row index of the goal node
+
+		Returns
+		-------
+		path : list of int
+			row indices from start to goal, empty if no path exists
+		stats : SearchStats
+			search counters of both directions and path cost
+		"""
+
+		if start == goal:
+			return [start], SearchStats(path_cost=0.0)
+
+		offsets, indices, costs = memoryview(self.offsets), memoryview(self.indices), memoryview(self.costs)
+		x, y = memoryview(self.x), memoryview(self.y)
+		k = 0.5 * self.heuristic_scale()
+		sx, sy, tx, ty = x[start], y[start], x[goal], y[goal]
+
+		def potential(v):
+			"""forward potential, the reverse search uses its negative"""
+			return k * (hypot(x[v] - tx, y[v] - ty) - hypot(x[v] - sx, y[v] - sy))
+
+		states = (self._state(0), self._state(1))
+		self._generation += 1
+		gen = self._generation
+		for (gScore, parent, visited, _), root in zip(states, (start, goal)):
+			gScore[root] = 0.0
+			parent[root] = -1
+			visited[root] = gen
+
+		sign = (1.0, -1.0)
+		openSets = ([(potential(start), 0, start)], [(-potential(goal), 0, goal)])
+		best, meet = inf, -1
+		count = 0
+		expanded = 0
+		peak = 2
+
+		while openSets[0] and openSets[1]:
+			if len(openSets[0]) + len(openSets[1]) > peak:
+				peak = len(openSets[0]) + len(openSets[1])
+
+			# no open node can lie on a path cheaper than the best one found
+			if openSets[0][0][0] + openSets[1][0][0] >= best:
+				break
+
+			# expand the direction with the smaller open set
+			d = 0 if len(openSets[0]) <= len(openSets[1]) else 1
+			gScore, parent, visited, closed = states[d]
+			otherScore, _, otherVisited, _ = states[1 - d]
+
+			_, _, c = heappop(openSets[d])
+			if closed[c] == gen:
+				continue
+			closed[c] = gen
+			expanded += 1
+			g = gScore[c]
+
+			for i in range(offsets[c], offsets[c+1]):
+				n = indices[i]
+				if visited[n] != gen:
+					visited[n] = gen
+					gScore[n] = inf
+				temp_score = g + costs[i]
+				if temp_score < gScore[n]:
+					gScore[n] = temp_score
+					parent[n] = c
+					count += 1
+					heappush(openSets[d], (temp_score + sign[d] * potential(n), count, n))
+
+				# the searches meet at n
+				if otherVisited[n] == gen and gScore[n] + otherScore[n] < best:
+					best = gScore[n] + otherScore[n]
+					meet = n
+
+		stats = SearchStats(expanded, count + 2, peak, best)
+		if meet < 0:
+			return [], stats
+
+		# walk forward parents back to the start, then reverse parents on to the goal
+		path = []
+		c = meet
+		while c >= 0:
+			path.append(c)
+			c = states[0][1][c]
+		path.reverse()
+		c = states[1][1][meet]
+		while c >= 0:
+			path.append(c)
+			c = states[1][1][c]
+		return path, stats
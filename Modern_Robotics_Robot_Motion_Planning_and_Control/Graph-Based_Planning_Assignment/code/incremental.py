@@ -0,0 +1,257 @@
+from heapq import heappush, heappop
+from math import inf, hypot
+
+from planner import Planner
+from stats import SearchStats
+
+
+class IncrementalPlanner(Planner):
+	"""Planner that repairs its search after edge changes using D* Lite.
+
+	D* Lite searches backward from the goal and keeps its g and rhs values
+	between calls. When an edge cost changes only the nodes whose cost-to-goal
+	is affected are re-expanded, and the start may move along the path without
+	restarting the search. Uses the dict backend, whose edges can be edited.
+
+	...
+
+	Attributes
+	----------
+	start : str
+		id of the current start node
+	goal : str
+		id of the goal node
+
+	Methods
+	-------
+	plan(start, goal)
+		runs the initial search and returns the path
+	update_edge(id1, id2, cost)
+		changes (or adds) the edge between two nodes
+	remove_edge(id1, id2)
+		removes the edge between two nodes
+	move_start(id_)
+		moves the start, e.g. after the robot took a step along the path
+	replan()
+		repairs the search after changes and returns the new path
+	"""
+
+	def __init__(self, path_to_data):
+		"""Constructor for IncrementalPlanner class. Loads data from specified location"""
+		super().__init__(path_to_data)
+		self.start = None
+		self.goal = None
+
+	def _h(self, id_):
+		"""Consistent lower bound on the cost between the start and a node"""
+		a, b = self.nodes[self.start], self.nodes[id_]
+		return self._k * hypot(a.x - b.x, a.y - b.y)
+
+	def _key(self, id_):
+		"""Priority of a node in the open set"""
+		m = min(self._g.get(id_, inf), self._rhs.get(id_, inf))
+		return (m + self._h(id_) + self._km, m)
+
+	def _push(self, id_):
+		"""Inserts a node in the open set or updates its key, older heap entries become stale"""
+		key = self._key(id_)
+		self._open[id_] = key
+		self._count += 1
+		heappush(self._heap, (key, self._count, id_))
+
+	def _top(self):
+		"""Gets the (key, id) of the open node with the smallest key, dropping stale entries"""
+		while self._heap:
+			key, _, id_ = self._heap[0]
+			if self._open.get(id_) == key:
+				return key, id_
+			heappop(self._heap)
+		return (inf, inf), None
+
+	def _update_vertex(self, id_):
+		"""Puts a node in the open set if it is inconsistent, and takes it out otherwise"""
+		if self._g.get(id_, inf) != self._rhs.get(id_, inf):
+			self._push(id_)
+		else:
+			self._open.pop(id_, None)
+
+	def _best_rhs(self, id_):
+		"""Gets the one-step lookahead cost-to-goal of a node"""
+		g = self._g
+		return min((cost + g.get(n, inf) for n, cost in self.nodes[id_].neighbors.items()), default=inf)
+
+	def _initialize(self):
+		"""Clears all search state and seeds the open set with the goal"""
+		self._k = self._heuristic_scale()
+		self._g, self._rhs, self._open = dict(), {self.goal: 0.0}, dict()
+		self._heap, self._count, self._km = [], 0, 0.0
+		self._push(self.goal)
+
+	def _compute_shortest_path(self):
+		"""Expands inconsistent nodes until the start's cost-to-goal is known.
+
+		Returns
+		-------
+		stats : SearchStats
+			counters of this repair, generated counts open set insertions
+		"""
+		g, rhs = self._g, self._rhs
+		stats = SearchStats()
+		generated = self._count
+
+		while True:
+			if len(self._heap) > stats.peak_open:
+				stats.peak_open = len(self._heap)
+
+			k_old, u = self._top()
+			if u is None or (k_old >= self._key(self.start) and rhs.get(self.start, inf) <= g.get(self.start, inf)):
+				stats.generated = self._count - generated
+				stats.path_cost = rhs.get(self.start, inf)
+				return stats
+
+			stats.expanded += 1
+			k_new = self._key(u)
+			if k_old < k_new:
+				# key is outdated since the start moved
+				self._push(u)
+			elif g.get(u, inf) > rhs.get(u, inf):
+				# overconsistent, u's cost-to-goal dropped
+				g[u] = rhs[u]
+				del self._open[u]
+				for s, cost in self.nodes[u].neighbors.items():
+					if s != self.goal and cost + g[u] < rhs.get(s, inf):
+						rhs[s] = cost + g[u]
+						self._update_vertex(s)
+			else:
+				# underconsistent, u's cost-to-goal rose
+				g_old = g.get(u, inf)
+				g[u] = inf
+				for s, cost in list(self.nodes[u].neighbors.items()) + [(u, None)]:
+					if s != self.goal and (s == u or rhs.get(s, inf) == cost + g_old):
+						rhs[s] = self._best_rhs(s)
+					self._update_vertex(s)
+
+	def _extract_path(self):
+		"""Follows the cheapest successors from the start to the goal"""
+		g = self._g
+		if self._rhs.get(self.start, inf) == inf:
+			return []
+
+		path = [self.start]
+		while path[-1] != self.goal and len(path) <= len(self.nodes):
+			c = path[-1]
+			path.append(min(self.nodes[c].neighbors, key=lambda n: self.nodes[c].neighbors[n] + g.get(n, inf)))
+		return path
+
+	def plan(self, start, goal):
+		"""Runs the initial search from scratch.
+
+		Parameters
+		----------
+		start : str
+			id of the starting node
+		goal: str
+			id of the goal node
+
+		Returns
+		-------
+		path : list of str
+			ids of the nodes in the optimal path (start -> goal), empty if no path exists
+		"""
+
+		self.start, self.goal = start, goal
+		self._last = start
+		self._initialize()
+		return self.replan()
+
+	def move_start(self, id_):
+		"""Moves the start, keeping the search state.
+
+		Parameters
+		----------
+		id_ : str
+			id of the new start node
+		"""
+
+		self.start = id_
+
+	def _edge_changed(self, u, v, old_cost):
+		"""Repairs rhs of u after the cost of edge u -> v changed from old_cost"""
+		if u == self.goal:
+			return
+		new_cost = self.nodes[u].neighbors.get(v, inf)
+		if new_cost < old_cost:
+			self._rhs[u] = min(self._rhs.get(u, inf), new_cost + self._g.get(v, inf))
+		elif self._rhs.get(u, inf) == old_cost + self._g.get(v, inf):
+			self._rhs[u] = self._best_rhs(u)
+		self._update_vertex(u)
+
+	def _set_edge(self, id1, id2, cost):
+		"""Sets the cost of the undirected edge between two nodes, inf removes it"""
+
+		a, b = self.nodes[id1], self.nodes[id2]
+		old_cost = a.neighbors.get(id2, inf)
+		if cost == inf:
+			a.neighbors.pop(id2, None)
+			b.neighbors.pop(id1, None)
+		else:
+			a.set_neighbor(id2, cost)
+			b.set_neighbor(id1, cost)
+
+		if self.goal is None:
+			return
+
+		# a cheaper edge can break the euclidean bound, then the search starts over
+		length = hypot(a.x - b.x, a.y - b.y)
+		if cost < self._k * length:
+			self._scale = cost / length
+			self._initialize()
+			return
+
+		# account for start moves since the keys in the open set were computed
+		self._km += self._h(self._last)
+		self._last = self.start
+
+		self._edge_changed(id1, id2, old_cost)
+		self._edge_changed(id2, id1, old_cost)
+
+	def update_edge(self, id1, id2, cost):
+		"""Changes the cost of the edge between two nodes, adding it if missing.
+
+		Parameters
+		----------
+		id1, id2 : str
+			ids of the nodes connected by the edge
+		cost : float
+			new edge cost
+		"""
+
+		self._set_edge(id1, id2, float(cost))
+
+	def remove_edge(self, id1, id2):
+		"""Removes the edge between two nodes, e.g. when an obstacle blocks it.
+
+		Parameters
+		----------
+		id1, id2 : str
+			ids of the nodes connected by the edge
+		"""
+
+		self._set_edge(id1, id2, inf)
+
+	def replan(self):
+		"""Repairs the search after edge changes or start moves.
+
+		Returns
+		-------
+		path : list of str
+			ids of the nodes in the optimal path (start -> goal), empty if no path exists
+		"""
+
+		self._run(self._repair, self.start, self.goal)
+		return self.path if self.stats.path_length else []
+
+	def _repair(self, start, goal):
+		"""Repairs the search and extracts the path, in the form _run expects"""
+		stats = self._compute_shortest_path()
+		return self._extract_path(), stats
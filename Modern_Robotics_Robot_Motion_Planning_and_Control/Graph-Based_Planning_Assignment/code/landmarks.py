@@ -0,0 +1,169 @@
+import numpy as np
+
+
+# rows whose bounds are computed together the first time a search reaches one of them
+BLOCK = 256
+
+class Landmarks():
+	"""Landmark (ALT) lower bounds on path cost for a CSRGraph.
+
+	For a landmark L, the triangle inequality gives |d(L,t) - d(L,v)| <= d(v,t)
+	on an undirected graph, so the largest such difference over all landmarks
+	is an admissible and consistent heuristic for any goal t.
+
+	...
+
+	Attributes
+	----------
+	rows : int64 array
+		row index of each landmark
+	dist : float32 array
+		K x n_nodes table of path costs from each landmark to every node
+
+	Methods
+	-------
+	build(graph, k, workers)
+		picks k landmarks and computes their distance tables in parallel
+	heuristic(goal)
+		gets lower bounds on the path cost to a goal row, filled in as a search reaches rows
+	save(file), load(file)
+		stores or reads the landmarks as a .npz file
+	"""
+
+	# arrays that fully describe the landmarks, used to share or store them
+	ARRAYS = ('rows', 'dist', 'slack')
+
+	def __init__(self, rows, dist):
+		"""
+		Parameters
+		----------
+		rows : int array
+			row index of each landmark
+		dist : float array
+			K x n_nodes table of path costs from each landmark, inf where unreachable
+		"""
+
+		self.rows = np.asarray(rows, dtype=np.int64)
+		self.dist = np.asarray(dist, dtype=np.float32)
+
+		# bound on float32 rounding error of a difference of two table entries,
+		# subtracted from every bound so the heuristic stays admissible
+		finite = self.dist[np.isfinite(self.dist)]
+		self.slack = np.array(4 * np.finfo(np.float32).eps * (finite.max() if finite.size else 0.0))
+
+	@classmethod
+	def from_arrays(cls, arrays):
+		"""Wraps existing arrays as landmarks without copying them"""
+		landmarks = cls.__new__(cls)
+		for name in cls.ARRAYS:
+			setattr(landmarks, name, arrays[name])
+		return landmarks
+
+	def arrays(self):
+		"""Gets the named arrays that fully describe the landmarks"""
+		return {name: getattr(self, name) for name in self.ARRAYS}
+
+	@staticmethod
+	def select(graph, k):
+		"""Picks k landmarks spread over the graph by farthest-point selection on node positions.
+
+		Parameters
+		----------
+		graph : CSRGraph
+			graph to pick landmarks in
+		k : int
+			number of landmarks
+
+		Returns
+		-------
+		rows : int64 array
+			row index of each landmark
+		"""
+
+		k = min(k, graph.n_nodes)
+		xy = np.stack((graph.x, graph.y), axis=1)
+
+		# start from the node farthest from the centroid, landmarks work best on the periphery
+		rows = [int(np.argmax(np.hypot(*(xy - xy.mean(axis=0)).T)))]
+		nearest = np.hypot(*(xy - xy[rows[0]]).T)
+		while len(rows) < k:
+			rows.append(int(np.argmax(nearest)))
+			nearest = np.minimum(nearest, np.hypot(*(xy - xy[rows[-1]]).T))
+		return np.array(rows, dtype=np.int64)
+
+	@classmethod
+	def build(cls, graph, k=8, workers=None):
+		"""Picks k landmarks and computes their distance tables with Dijkstra in parallel.
+
+		Parameters
+		----------
+		graph : CSRGraph
+			graph to preprocess
+		k : int
+			number of landmarks
+		workers : int
+			number of worker processes, defaults to the number of CPUs
+		"""
+
+		# imported here since batch depends on this module
+		from batch import dijkstra_batch
+
+		rows = cls.select(graph, k)
+		return cls(rows, np.stack(dijkstra_batch(graph, rows.tolist(), workers)))
+
+	def heuristic(self, goal):
+		"""Gets lower bounds on the path cost to a goal, computed only for the rows a search reaches.
+
+		Bounds are filled in a block of rows at a time, so a query costs
+		O(K) per row near the nodes it touches instead of O(K n).
+
+		Parameters
+		----------
+		goal : int
+			row index of the goal node
+
+		Returns
+		-------
+		h : float64 array
+			lower bound on the cost-to-go of each row, nan until filled
+		fill : function
+			fills the block holding a row and returns the row's bound
+		"""
+
+		n = self.dist.shape[1]
+		h = np.full(n, np.nan)
+		to_goal = self.dist[:, goal:goal+1]
+		slack = float(self.slack)
+
+		def fill(row):
+			lo = row - row % BLOCK
+			with np.errstate(invalid='ignore'):
+				diff = np.abs(to_goal - self.dist[:, lo:lo+BLOCK])
+
+			# inf - inf means neither node reaches the landmark, which gives no bound
+			diff[np.isnan(diff)] = 0.0
+			h[lo:lo+BLOCK] = np.maximum(diff.max(axis=0).astype(np.float64) - slack, 0.0)
+			return h[row]
+		return h, fill
+
+	def save(self, file):
+		"""Saves the landmarks as a .npz file
+
+		Parameters
+		----------
+		file : str
+			path of the file to write
+		"""
+		np.savez(file, **self.arrays())
+
+	@classmethod
+	def load(cls, file):
+		"""Loads landmarks saved by save
+
+		Parameters
+		----------
+		file : str
+			path of the file to read
+		"""
+		with np.load(file) as data:
+			return cls.from_arrays({name: data[name] for name in cls.ARRAYS})
@@ -1,6 +1,8 @@
 import argparse
+import json
 import time
 from planner import Planner
+from batch import load_queries
 
 
 if __name__ == "__main__":
@@ -13,16 +15,61 @@ if __name__ == "__main__":
     parser.add_argument("--path_to_output", default="../data/")
     parser.add_argument("--start_node", default='1')
     parser.add_argument("--goal_node", default='12')
+    parser.add_argument("--backend", choices=["dict", "csr"], default="dict")
+    parser.add_argument("--search", choices=["astar", "bidirectional", "ch"], default="astar")
+    parser.add_argument("--cache", action="store_true")
+    parser.add_argument("--landmarks", default=None)
+    parser.add_argument("--n_landmarks", default=8, type=int)
+    parser.add_argument("--contraction", default=None)
+    parser.add_argument("--queries", default=None)
+    parser.add_argument("--workers", default=None, type=int)
+    parser.add_argument("--stats", action="store_true")
+    parser.add_argument("--binary", action="store_true")
     args = parser.parse_args()
 
-    # initialize planner object
-    planner = Planner(args.path_to_data)
+    if args.queries:
+        # batch mode shares the csr arrays with worker processes
+        planner = Planner(args.path_to_data, backend="csr", cache=args.cache, stats=args.stats)
+        if args.landmarks: planner.use_landmarks(args.landmarks, args.n_landmarks, args.workers)
+        queries = load_queries(args.queries)
 
-    # run A* planner
-    planner.plan_astar(args.start_node,args.goal_node)
+        # run A* planner for every query across worker processes
+        search_start = time.time()
+        paths = planner.plan_batch(queries, args.workers)
+        search_time = time.time() - search_start
+        if args.stats:
+            print(json.dumps({"parse_time": planner.stats.parse_time, "search_time": search_time,
+                              "queries": len(paths), "queries_per_s": len(paths)/search_time}))
+        else:
+            print(f"Planned {len(paths)} queries in {search_time:.4f}s ({len(paths)/search_time:.1f} queries/s)")
 
-    # save path data
-    planner.save_path(args.path_to_output)
+        # save all paths to one file
+        planner.save_paths(paths, args.path_to_output)
+    else:
+        # initialize planner object, landmarks and contraction hierarchies need the csr backend
+        backend = "csr" if args.landmarks or args.search == "ch" else args.backend
+        planner = Planner(args.path_to_data, backend=backend, cache=args.cache, stats=args.stats)
+        if args.landmarks: planner.use_landmarks(args.landmarks, args.n_landmarks, args.workers)
+        if args.search == "ch": planner.use_contraction(args.contraction)
+
+        # run A* planner
+        if args.search == "astar":
+            planner.plan_astar(args.start_node,args.goal_node)
+        elif args.search == "bidirectional":
+            planner.plan_bidirectional(args.start_node,args.goal_node)
+        elif args.search == "ch":
+            planner.plan_ch(args.start_node,args.goal_node)
+
+        # report results
+        if args.stats:
+            print(json.dumps(planner.stats.to_dict()))
+        elif planner.stats.path_length:
+            print("Optimal Path Found: ", planner.path)
+        else:
+            print("No Path Found!")
+
+        # save path data
+        planner.save_path(args.path_to_output, args.binary)
 
     end = time.time()
-    print(f"Elapsed Time: {end-start}s")
\ No newline at end of file
+    if not args.stats: print(f"Elapsed Time: {end-start}s")
\ No newline at end of file
@@ -26,6 +26,8 @@ class Node():
 		cost of traveling to this node from starting node
 	fScore : float
 		cost of traveling from the starting node to the goal node through this node
+	generation : int
+		search query that last wrote parent, gScore and fScore
 
 	Methods
 	-------
@@ -56,6 +58,7 @@ class Node():
 
 		self.gScore 	= inf
 		self.fScore 	= inf
+		self.generation	= -1
 
 	def __repr__(self):
 		"""Prints node information."""
@@ -0,0 +1,107 @@
+# copy of Sampling-Based_Planning_Assignment/code/output.py (that one uses spaces), keep the two in sync
+
+import csv
+
+import numpy as np
+
+
+# rows converted to python values at a time, bounds the memory used to write large outputs
+CHUNK = 65536
+
+# column names of nodes.csv and edges.csv, also the array names in results.npz
+NODE_COLUMNS = ('ID', 'x', 'y')
+EDGE_COLUMNS = ('ID1', 'ID2', 'cost')
+
+
+def write_csv(file, columns, header=None):
+	"""Streams equal length columns to a csv file, a chunk of rows at a time
+
+	Parameters
+	----------
+	file : str
+		path of the file to write
+	columns : sequence of 1D arrays
+		one array per csv column
+	header : sequence of str
+		column names, written as a '# ' comment row
+	"""
+
+	columns = [np.asarray(c) for c in columns]
+	n = len(columns[0]) if columns else 0
+	with open(file, 'w') as csv_file:
+		writer = csv.writer(csv_file)
+		if header is not None:
+			writer.writerow(['# ' + header[0], *header[1:]])
+		for lo in range(0, n, CHUNK):
+			writer.writerows(zip(*(c[lo:lo + CHUNK].tolist() for c in columns)))
+
+
+def save_results(out_dir, path, nodes=None, edges=None, binary=False):
+	"""Saves a path, and optionally the nodes and edges it was planned over
+
+	As csv, writes path.csv [node_1, node_2, ...], nodes.csv [ID,x,y] and
+	edges.csv [ID1,ID2,cost]. As binary, writes the same columns as arrays
+	in one results.npz, with the path under 'path' and the rest under the
+	csv column names.
+
+	Parameters
+	----------
+	out_dir : str
+		path to directory in which to save results (ending in /)
+	path : sequence
+		ids of the path nodes (start -> goal)
+	nodes : tuple of 1D arrays
+		ID, x and y columns
+	edges : tuple of 1D arrays
+		ID1, ID2 and cost columns
+	binary : bool
+		write results.npz instead of csv files
+	"""
+
+	if binary:
+		arrays = {'path': np.asarray(path)}
+		for names, columns in ((NODE_COLUMNS, nodes), (EDGE_COLUMNS, edges)):
+			if columns is not None:
+				arrays.update(zip(names, map(np.asarray, columns)))
+		np.savez(out_dir + "results.npz", **arrays)
+		return
+
+	with open(out_dir + "path.csv", 'w') as path_file:
+		csv.writer(path_file).writerow(path)
+	if nodes is not None:
+		write_csv(out_dir + "nodes.csv", nodes, NODE_COLUMNS)
+	if edges is not None:
+		write_csv(out_dir + "edges.csv", edges, EDGE_COLUMNS)
+
+
+def save_paths(out_dir, paths):
+	"""Saves one path per row as paths.csv
+
+	Parameters
+	----------
+	out_dir : str
+		path to directory in which to save results (ending in /)
+	paths : list of sequences
+		ids of the nodes of each path (start -> goal)
+	"""
+
+	with open(out_dir + "paths.csv", 'w') as path_file:
+		csv.writer(path_file).writerows(paths)
+
+
+def load_results(file):
+	"""Loads results.npz written by save_results
+
+	Parameters
+	----------
+	file : str
+		path of the file to read
+
+	Returns
+	-------
+	results : dict of arrays
+		'path' and whichever node and edge columns were saved
+	"""
+
+	with np.load(file) as data:
+		return {name: data[name] for name in data.files}
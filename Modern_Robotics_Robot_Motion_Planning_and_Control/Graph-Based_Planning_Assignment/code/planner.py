@@ -1,8 +1,16 @@
 import csv
-from numpy import argmin
-from operator import attrgetter
+import os
+import time
+from heapq import heappush, heappop
+from math import inf, hypot
 
 from node import Node
+from csr_graph import CSRGraph
+from batch import plan_batch
+from landmarks import Landmarks
+from contraction import ContractionHierarchy
+from stats import SearchStats
+from output import save_results, save_paths
 
 class Planner():
 	"""Class for planning optimal paths on graph-based networks.
@@ -11,8 +19,12 @@ class Planner():
 
 	Attributes
 	----------
-	nodes : dict of Node objects in graph network
+	nodes : dict of Node objects in graph network (dict backend)
+	graph : CSRGraph holding the network as arrays (csr backend)
+	landmarks : Landmarks supplying the A* heuristic for any goal (csr backend)
+	hierarchy : ContractionHierarchy answering plan_ch queries (csr backend)
 	path : list of nodes in optimal path (start -> goal)
+	stats : SearchStats of the last query
 
 	Methods
 	-------
@@ -22,17 +34,70 @@ class Planner():
 	_reconstruct_path(node)
 		private method to build optimal path by looping through parents until reaching start node
 
+	_search(start, goal)
+		private method running A* on the loaded backend and returning the path
+
 	plan_astar(start, goal)
 		uses the A* algorithm to build an optimal path through the network
 
-	save_path(path)
-		saves optimal path to a csv file
+	plan_bidirectional(start, goal)
+		uses bidirectional A* to build an optimal path through the network
+
+	plan_many(queries)
+		runs A* for many start/goal pairs and returns a path for each
+
+	use_landmarks(file, k, workers)
+		loads or builds landmark lower bounds used as the A* heuristic (csr backend)
+
+	use_contraction(file, witness_limit)
+		loads or builds a contraction hierarchy used by plan_ch (csr backend)
+
+	plan_ch(start, goal)
+		uses the contraction hierarchy to build an optimal path through the network
+
+	plan_batch(queries, workers)
+		runs A* for many start/goal pairs across worker processes (csr backend)
+
+	save_path(path, binary)
+		saves optimal path to a csv file, or to results.npz
+
+	save_paths(paths, path)
+		saves one path per row to a csv file
 	"""
-	def __init__(self, path_to_data):
-		"""Constructor for Planner class. Loads data from specified location"""
+	def __init__(self, path_to_data, backend='dict', cache=False, stats=False):
+		"""Constructor for Planner class. Loads data from specified location
+
+		Parameters
+		----------
+		path_to_data : str
+			path to directory containing nodes.csv and edges.csv
+		backend : str
+			'dict' to store the network as Node objects,
+			'csr' to store it as compact arrays in a CSRGraph
+		cache : bool
+			csr backend only, memory-maps a binary snapshot of the graph
+			that is written on the first load
+		stats : bool
+			also measures parse and search time in stats, counters are always kept
+		"""
 		self.nodes = dict()
+		self.graph = None
 		self.path = []
-		self._load_data(path_to_data)
+		self.stats = SearchStats()
+		self._timed = stats
+		self._generation = 0
+		self._scale = None
+		self.landmarks = None
+		self.hierarchy = None
+		parse_start = time.perf_counter() if stats else 0.0
+		if backend == 'csr':
+			self.graph = CSRGraph.load(path_to_data, cache)
+		elif backend == 'dict':
+			self._load_data(path_to_data)
+		else:
+			raise ValueError(f"unknown backend '{backend}', choose 'dict' or 'csr'")
+		if stats:
+			self.stats.parse_time = time.perf_counter() - parse_start
 
 	def _load_data(self, path):
 		"""Loads data from specified directory. Parses and stores in list of Node objects."""
@@ -60,91 +125,418 @@ class Planner():
 		----------
 		current : Node object
 			node to build the path from
+
+		Returns
+		-------
+		path : list of str
+			ids of the nodes in the path (start -> current)
 		"""
 
 		# add current node to path
-		self.path = [current.id]
+		path = [current.id]
 
 		# loop until no parents exist
 		while current.parent is not None:
 
-			# add node parent to beginning of path
-			self.path.insert(0, self.nodes[current.id].parent)
+			# add node parent to path
+			path.append(current.parent)
 
 			# new current node as current node's parent
 			current = self.nodes[current.parent]
 
-		print("Optimal Path Found: ", self.path)
+		# path was built goal -> start
+		return path[::-1]
+
+	def _touch(self, node):
+		"""Resets search state left on a node by a previous query."""
+		if node.generation != self._generation:
+			node.generation = self._generation
+			node.parent = None
+			node.gScore = inf
+			node.fScore = inf
+		return node
+
+	def _search(self, start, goal):
+		"""Runs A* on whichever backend is loaded.
 
-	def plan_astar(self, start, goal):
-		"""Plans an optimal path through the graph network using the A* algorithm.
-		
 		Parameters
 		----------
 		start : str
 			id of the starting node
 		goal: str
 			id of the goal node
+
+		Returns
+		-------
+		path : list of str
+			ids of the nodes in the optimal path (start -> goal), empty if no path exists
+		stats : SearchStats
+			search counters and path cost
 		"""
 
-		openSet = []
-		# set openSet to the starting node
-		openSet.append(self.nodes[start])
+		# search directly over the arrays when using the csr backend
+		if self.graph is not None:
+			goal_row = self.graph.index(goal)
+			h, fill = (None, None) if self.landmarks is None else self.landmarks.heuristic(goal_row)
+			rows, stats = self.graph.astar(self.graph.index(start), goal_row, h, fill)
+			return [str(i) for i in self.graph.ids[rows].tolist()], stats
+
+		expanded = 0
+		peak = 1
 
-		# the node immediately preceding with the cheapest path
-		self.nodes[start].parent = None
+		# start a new generation, so state from earlier queries is ignored
+		self._generation += 1
+		touch = self._touch
 
-		# set gScore and gScore for start node
-		self.nodes[start].gScore = 0
-		self.nodes[start].fScore = self.nodes[start].h + self.nodes[start].gScore
+		# set gScore and fScore for start node
+		s = touch(self.nodes[start])
+		s.gScore = 0
+		s.fScore = s.h + s.gScore
 
-		# run while there are objects in openSet list
+		# heap entries are (fScore, insertion count, id), count breaks ties in FIFO order
+		count = 0
+		openSet = [(s.fScore, count, start)]
+		closedSet = set()
+
+		# run while there are objects in openSet heap
 		while openSet:
-			# sort openSet by fScore, node with smallest fScore will be at 0
-			openSet.sort(key=lambda x: x.fScore)
-			c = openSet[0].id
+			if len(openSet) > peak:
+				peak = len(openSet)
+
+			# pop node with smallest fScore
+			f, _, c = heappop(openSet)
+			current = self.nodes[c]
+
+			# skip stale entries and nodes that were already expanded
+			if c in closedSet or f > current.fScore:
+				continue
 
 			# check if current node is the goal
 			if c == goal:
 				# get optimal path
-				self._reconstruct_path(self.nodes[c])
-				return
+				return self._reconstruct_path(current), SearchStats(expanded, count + 1, peak, current.gScore)
+
+			# mark current node as expanded
+			closedSet.add(c)
+			expanded += 1
 
-			# remove current node from openSet
-			openSet.remove(self.nodes[c])
+			for n, cost in current.neighbors.items():
+				if n in closedSet:
+					continue
 
-			# sort through neighbors of c based on their gScore
-			for n in sorted(self.nodes[c].neighbors.keys(), key=lambda x: self.nodes[x].gScore):
 				# distance from start to neighbor through current (gScore + edge_cost)
-				temp_score = self.nodes[c].gScore + self.nodes[c].neighbors[n]
+				temp_score = current.gScore + cost
+				neighbor = touch(self.nodes[n])
 				
 				# check for score less than best gScore
-				if temp_score < self.nodes[n].gScore:
+				if temp_score < neighbor.gScore:
 
 					# if better, update parent, gScore, and fScore
-					self.nodes[n].parent = c
-					self.nodes[n].gScore = temp_score
-					self.nodes[n].fScore = self.nodes[n].gScore + self.nodes[n].h
+					neighbor.parent = c
+					neighbor.gScore = temp_score
+					neighbor.fScore = neighbor.gScore + neighbor.h
+
+					# push neighbor, any older entry for it becomes stale
+					count += 1
+					heappush(openSet, (neighbor.fScore, count, n))
+
+		return [], SearchStats(expanded, count + 1, peak)
 
-					# add nieghbor to openSet if not already in
-					if n not in openSet:
-						openSet.append(self.nodes[n])
+	def plan_astar(self, start, goal):
+		"""Plans an optimal path through the graph network using the A* algorithm.
+
+		The open set is a binary heap keyed on fScore. Stale heap entries left
+		behind by a gScore improvement are skipped lazily when popped, and
+		expanded nodes are tracked in a closed set.
 		
+		Parameters
+		----------
+		start : str
+			id of the starting node
+		goal: str
+			id of the goal node
+		"""
+
+		self._run(self._search, start, goal)
+
+	def _run(self, search, start, goal):
+		"""Runs a search and stores its path and stats.
+
+		Parameters
+		----------
+		search : callable
+			search method taking (start, goal) and returning (path, stats)
+		start : str
+			id of the starting node
+		goal: str
+			id of the goal node
+		"""
+
+		if self._timed:
+			search_start = time.perf_counter()
+			self.path, stats = search(start, goal)
+			stats.search_time = time.perf_counter() - search_start
+			stats.parse_time = self.stats.parse_time
+		else:
+			self.path, stats = search(start, goal)
+
+		stats.path_length = len(self.path)
+		self.stats = stats
+
 		# return start node if no solution is found
-		print("No Path Found!")
-		self.path = [start]
+		if not self.path:
+			self.path = [start]
+
+	def _heuristic_scale(self):
+		"""Gets the largest k for which k times euclidean distance never exceeds an edge cost."""
+		if self._scale is None:
+			ratios = [cost / d for node in self.nodes.values() for n, cost in node.neighbors.items()
+					  if (d := hypot(node.x - self.nodes[n].x, node.y - self.nodes[n].y)) > 0]
+			self._scale = max(0.0, min(ratios, default=0.0))
+		return self._scale
+
+	def _search_bidirectional(self, start, goal):
+		"""Runs bidirectional A* on whichever backend is loaded.
+
+		Parameters
+		----------
+		start : str
+			id of the starting node
+		goal: str
+			id of the goal node
+
+		Returns
+		-------
+		path : list of str
+			ids of the nodes in the optimal path (start -> goal), empty if no path exists
+		stats : SearchStats
+			search counters of both directions and path cost
+		"""
+
+		if self.graph is not None:
+			rows, stats = self.graph.bidirectional(self.graph.index(start), self.graph.index(goal))
+			return [str(i) for i in self.graph.ids[rows].tolist()], stats
+
+		if start == goal:
+			return [start], SearchStats(path_cost=0.0)
+
+		k = 0.5 * self._heuristic_scale()
+		s, t = self.nodes[start], self.nodes[goal]
+
+		def potential(id_):
+			"""forward potential, the reverse search uses its negative"""
+			n = self.nodes[id_]
+			return k * (hypot(n.x - t.x, n.y - t.y) - hypot(n.x - s.x, n.y - s.y))
+
+		# search state for each direction is kept local to this query
+		gScores = ({start: 0.0}, {goal: 0.0})
+		parents = ({start: None}, {goal: None})
+		closedSets = (set(), set())
+		openSets = ([(potential(start), 0, start)], [(-potential(goal), 0, goal)])
+		sign = (1.0, -1.0)
+		best, meet = inf, None
+		count = 0
+		expanded = 0
+		peak = 2
+
+		while openSets[0] and openSets[1]:
+			if len(openSets[0]) + len(openSets[1]) > peak:
+				peak = len(openSets[0]) + len(openSets[1])
+
+			# no open node can lie on a path cheaper than the best one found
+			if openSets[0][0][0] + openSets[1][0][0] >= best:
+				break
 
-	def save_path(self, path):
+			# expand the direction with the smaller open set
+			d = 0 if len(openSets[0]) <= len(openSets[1]) else 1
+			gScore, otherScore = gScores[d], gScores[1 - d]
+
+			_, _, c = heappop(openSets[d])
+			if c in closedSets[d]:
+				continue
+			closedSets[d].add(c)
+			expanded += 1
+
+			for n, cost in self.nodes[c].neighbors.items():
+				temp_score = gScore[c] + cost
+				if temp_score < gScore.get(n, inf):
+					gScore[n] = temp_score
+					parents[d][n] = c
+					count += 1
+					heappush(openSets[d], (temp_score + sign[d] * potential(n), count, n))
+
+				# the searches meet at n
+				if n in otherScore and gScore[n] + otherScore[n] < best:
+					best = gScore[n] + otherScore[n]
+					meet = n
+
+		stats = SearchStats(expanded, count + 2, peak, best)
+		if meet is None:
+			return [], stats
+
+		# walk forward parents back to the start, then reverse parents on to the goal
+		path = []
+		c = meet
+		while c is not None:
+			path.append(c)
+			c = parents[0][c]
+		path.reverse()
+		c = parents[1][meet]
+		while c is not None:
+			path.append(c)
+			c = parents[1][c]
+		return path, stats
+
+	def plan_bidirectional(self, start, goal):
+		"""Plans an optimal path through the graph network using bidirectional A*.
+
+		Searches forward from the start and backward from the goal at once. Both
+		use the average of scaled euclidean heuristics to the goal and to the
+		start, so the heuristic column of nodes.csv is not needed.
+
+		Parameters
+		----------
+		start : str
+			id of the starting node
+		goal: str
+			id of the goal node
+		"""
+
+		self._run(self._search_bidirectional, start, goal)
+
+	def plan_many(self, queries):
+		"""Plans an optimal path for each start/goal pair, reusing the loaded graph.
+
+		Search state is kept per query, so the result of each query does not
+		depend on the queries run before it.
+
+		Parameters
+		----------
+		queries : iterable of (str, str)
+			(start, goal) node id pairs
+
+		Returns
+		-------
+		paths : list of list of str
+			optimal path for each pair, empty if no path exists
+		"""
+		return [self._search(start, goal)[0] for start, goal in queries]
+
+	def use_landmarks(self, file, k=8, workers=None):
+		"""Uses landmark (ALT) lower bounds as the A* heuristic instead of the csv column.
+
+		Loads the landmarks from file if it exists, otherwise picks k landmarks,
+		computes their distance tables in parallel and saves them to file.
+
+		Parameters
+		----------
+		file : str
+			path of the .npz landmark file
+		k : int
+			number of landmarks to build
+		workers : int
+			number of worker processes used to build, defaults to the number of CPUs
+		"""
+
+		if self.graph is None:
+			raise ValueError("landmarks require the 'csr' backend")
+
+		if os.path.exists(file):
+			self.landmarks = Landmarks.load(file)
+		else:
+			self.landmarks = Landmarks.build(self.graph, k, workers)
+			self.landmarks.save(file)
+
+	def use_contraction(self, file=None, witness_limit=64):
+		"""Prepares a contraction hierarchy of the graph for plan_ch.
+
+		Loads the hierarchy from file if it exists, otherwise builds it (which
+		can take a while on large graphs) and saves it to file.
+
+		Parameters
+		----------
+		file : str
+			path of the .npz hierarchy file, if None the hierarchy is built and not saved
+		witness_limit : int
+			nodes settled per witness search while building
+		"""
+
+		if self.graph is None:
+			raise ValueError("contraction hierarchies require the 'csr' backend")
+
+		if file is not None and os.path.exists(file):
+			self.hierarchy = ContractionHierarchy.load(file)
+		else:
+			self.hierarchy = ContractionHierarchy.build(self.graph, witness_limit)
+			if file is not None:
+				self.hierarchy.save(file)
+
+	def plan_ch(self, start, goal):
+		"""Plans an optimal path through the graph network using the contraction hierarchy.
+
+		Parameters
+		----------
+		start : str
+			id of the starting node
+		goal: str
+			id of the goal node
+		"""
+
+		if self.hierarchy is None:
+			self.use_contraction()
+		self._run(self._search_ch, start, goal)
+
+	def _search_ch(self, start, goal):
+		"""Queries the contraction hierarchy, returning the path as ids and stats."""
+		rows, stats = self.hierarchy.query(self.graph.index(start), self.graph.index(goal))
+		return [str(i) for i in self.graph.ids[rows].tolist()], stats
+
+	def plan_batch(self, queries, workers=None):
+		"""Plans an optimal path for each start/goal pair across worker processes.
+
+		Requires the csr backend, whose arrays are shared with the workers.
+
+		Parameters
+		----------
+		queries : list of (str, str)
+			(start, goal) node id pairs
+		workers : int
+			number of worker processes, defaults to the number of CPUs
+
+		Returns
+		-------
+		paths : list of list of str
+			optimal path for each pair, empty if no path exists
+		"""
+
+		if self.graph is None:
+			raise ValueError("plan_batch requires the 'csr' backend")
+		return plan_batch(self.graph, queries, workers, landmarks=self.landmarks)
+
+	def save_path(self, path, binary=False):
 		"""Saves the optimal path as a csv file in the specified directory
 
 		If optimal path does not exist (i.e. path is empty), returns error
 
 		Parameters
 		----------
+		path : str
+			path to directory in which to save results
+		binary : bool
+			saves the path as an array in results.npz instead, as the sampling planners do
+		"""
+
+		save_results(path, self.path, binary=binary)
+
+	def save_paths(self, paths, path):
+		"""Saves one path per row as a csv file in the specified directory
+
+		Parameters
+		----------
+		paths : list of list of str
+			paths to save, e.g. as returned by plan_many or plan_batch
 		path : str
 			path to directory in which to save results
 		"""
 
-		with open(path + "path.csv", 'w') as path_file:
-			writer = csv.writer(path_file)
-			writer.writerow(self.path)
+		save_paths(path, paths)
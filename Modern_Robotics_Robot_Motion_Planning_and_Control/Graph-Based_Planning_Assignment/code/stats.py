@@ -0,0 +1,53 @@
+from math import inf
+
+
+class SearchStats():
+	"""Counters and timings describing one planner query.
+
+	Counters are kept by the search loops themselves, timings are only
+	measured when stats are enabled on the Planner.
+
+	...
+
+	Attributes
+	----------
+	parse_time : float
+		seconds spent loading the graph
+	search_time : float
+		seconds spent in the search
+	expanded : int
+		number of nodes expanded
+	generated : int
+		number of nodes pushed onto the open set
+	peak_open : int
+		largest open set size seen, counting stale entries
+	path_cost : float
+		cost of the path found, inf if no path exists
+	path_length : int
+		number of nodes in the path found
+
+	Methods
+	-------
+	to_dict()
+		gets the stats as a dict, e.g. for json output
+	"""
+
+	def __init__(self, expanded=0, generated=0, peak_open=0, path_cost=inf):
+		self.parse_time 	= 0.0
+		self.search_time 	= 0.0
+		self.expanded 		= expanded
+		self.generated 		= generated
+		self.peak_open 		= peak_open
+		self.path_cost 		= path_cost
+		self.path_length 	= 0
+
+	def __repr__(self):
+		"""Prints stats information."""
+		return "\n".join(f"{k}: {v}" for k, v in self.to_dict().items())
+
+	def to_dict(self):
+		"""Gets the stats as a dict, with an unreachable path cost as None"""
+		stats = dict(vars(self))
+		if stats['path_cost'] == inf:
+			stats['path_cost'] = None
+		return stats
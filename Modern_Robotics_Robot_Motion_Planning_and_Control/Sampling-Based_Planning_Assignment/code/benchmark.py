@@ -0,0 +1,505 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from sampling_planners import SamplingPlanner
+from prm import PRM
+from rrt import RRT
+from rrt_star import RRTStar
+from rrt_connect import RRTConnect
+from grid_planner import GridPlanner
+
+
+def legacy_nearest(planner, pos):
+    """Nearest node by sorting every node, as _knn did before the spatial index"""
+    return sorted(range(len(planner.tree)), key=lambda x: planner._dist(planner.tree.pos[x], pos))[0]
+
+
+def index_nearest(planner, pos):
+    """Nearest node from the planner's spatial index"""
+    return planner.index.nearest(pos)
+
+
+def grow(planner, n_nodes, nearest):
+    """Grows an RRT (without goal checks) until it holds n_nodes nodes.
+
+    Parameters
+    ----------
+    planner : SamplingPlanner
+        planner holding the tree and obstacles
+    n_nodes : int
+        tree size to grow to
+    nearest : function
+        gets the id of the node closest to a position
+    """
+
+    while len(planner.tree) < n_nodes:
+        sample_pos = planner._sample()
+        parent = nearest(planner, sample_pos)
+        parent_pos = planner.tree.pos[parent]
+        d = planner._dist(parent_pos, sample_pos)
+        new = parent_pos + planner.step * (sample_pos - parent_pos) / d if d > planner.step else sample_pos
+        if not planner._is_in_collision_point(new):
+            planner._add_node(new, parent)
+
+
+def write_obstacles(dir_, n_obstacles, seed=0):
+    """Writes n_obstacles random circles inside C as obstacles.csv.
+
+    Parameters
+    ----------
+    dir_ : str
+        directory to write the csv file to (ending in /)
+    n_obstacles : int
+        number of obstacles
+    seed : int
+        seed for the obstacle positions and sizes
+    """
+
+    rng = np.random.default_rng(seed)
+    with open(dir_ + 'obstacles.csv', 'w') as obs_file:
+        obs_file.write("# x,y,diameter\n")
+        for x, y, d in zip(*rng.uniform(-0.5, 0.5, (2, n_obstacles)), rng.uniform(0.01, 0.05, n_obstacles)):
+            obs_file.write(f"{x},{y},{d}\n")
+
+
+def brute_points(planner, points, chunk=64):
+    """Checks points against every obstacle at once, without the broad phase"""
+    hits = []
+    for p in np.array_split(points, max(1, len(points) // chunk)):
+        diff = p[:, None, :] - planner.obs_xy[None, :, :]
+        hits.append(((diff**2).sum(axis=2) < planner.obs_r2).any(axis=1))
+    return np.concatenate(hits)
+
+
+def brute_segments(planner, a, b, chunk=64):
+    """Checks segments against every obstacle at once, without the broad phase"""
+    hits = []
+    for sa, sb in zip(np.array_split(a, max(1, len(a) // chunk)), np.array_split(b, max(1, len(b) // chunk))):
+        d = (sb - sa)[:, None, :]
+        ac = planner.obs_xy[None, :, :] - sa[:, None, :]
+        t = np.clip((ac * d).sum(axis=2) / np.maximum((d**2).sum(axis=2), 1e-300), 0.0, 1.0)
+        hits.append((((ac - t[:, :, None] * d)**2).sum(axis=2) < planner.obs_r2).any(axis=1))
+    return np.concatenate(hits)
+
+
+def write_passage(dir_, gap, center=0.3, length=0.5, diameter=0.06, spacing=0.04):
+    """Writes a thick wall of circles across x = 0 with one narrow corridor through it as obstacles.csv.
+
+    The corridor is away from the straight line between the default start and
+    goal, so the trees have to find their way into it.
+
+    Parameters
+    ----------
+    dir_ : str
+        directory to write the csv file to (ending in /)
+    gap : float
+        free width of the corridor
+    center : float
+        y of the corridor's center line
+    length : float
+        thickness of the wall, i.e. length of the corridor
+    diameter : float
+        diameter of the circles in the wall
+    spacing : float
+        distance between neighboring circle centers
+    """
+
+    with open(dir_ + 'obstacles.csv', 'w') as obs_file:
+        obs_file.write("# x,y,diameter\n")
+        # circles stacked away from both edges of the corridor, out to the bounds of C
+        above = np.arange(center + (gap + diameter) / 2, 0.5 + diameter / 2, spacing)
+        below = np.arange(center - (gap + diameter) / 2, -0.5 - diameter / 2, -spacing)
+        for x in np.arange(-length / 2, length / 2 + spacing / 2, spacing):
+            for y in np.concatenate((above, below)):
+                obs_file.write(f"{x},{y},{diameter}\n")
+
+
+def bench_collision(counts, n_checks, loop_max):
+    """Reports point and segment checks per second, looping over Obstacle objects,
+    vectorized over all obstacles and with the obstacle grid broad phase.
+
+    Parameters
+    ----------
+    counts : list of int
+        obstacle counts to benchmark
+    n_checks : int
+        number of random points and segments to check
+    loop_max : int
+        largest obstacle count to run the Obstacle loop at
+    """
+
+    rng = np.random.default_rng(0)
+    a = rng.uniform(-0.5, 0.5, (n_checks, 2))
+    b = a + rng.uniform(-0.05, 0.05, (n_checks, 2))
+
+    print(f"{'':>10} {'points/s':^38} {'segments/s':^38}")
+    print(f"{'obstacles':>10}" + 2 * f" {'loop':>12} {'all':>12} {'grid':>12}")
+    for n_obstacles in counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            write_obstacles(tmp + os.sep, n_obstacles)
+            planner = SamplingPlanner(tmp + os.sep, tmp + os.sep)
+
+        row = f"{n_obstacles:>10}"
+        for loop, check in ((True, lambda: [any(o.is_in_collision_point(p) for o in planner.obs) for p in a]),
+                            (False, lambda: brute_points(planner, a)),
+                            (False, lambda: planner._points_in_collision(a)),
+                            (True, lambda: [any(o.is_in_collision_line(p, q) for o in planner.obs) for p, q in zip(a, b)]),
+                            (False, lambda: brute_segments(planner, a, b)),
+                            (False, lambda: planner._segments_in_collision(a, b))):
+            if loop and n_obstacles > loop_max:
+                row += f" {'-':>12}"
+                continue
+            start = time.perf_counter()
+            check()
+            row += f" {n_checks / (time.perf_counter() - start):>12.0f}"
+        print(row)
+
+
+def legacy_sample(planner):
+    """Samples one point at a time with scalar draws, as _sample did before the batched sampler"""
+    while True:
+        x, y = np.random.uniform(-0.5, 0.5), np.random.uniform(-0.5, 0.5)
+        if not planner._is_in_collision_point([x, y]):
+            return np.array([x, y])
+
+
+def dispersion(planner, points, resolution=200):
+    """Largest distance from a free probe grid point to its closest sample, smaller means better coverage"""
+    probe = (np.stack(np.meshgrid(*2 * [np.arange(resolution)]), axis=-1).reshape(-1, 2) + 0.5) / resolution - 0.5
+    probe = probe[~planner._points_in_collision(probe)]
+    closest = np.full(len(probe), np.inf)
+    for p in np.array_split(points, max(1, len(points) // 64)):
+        closest = np.minimum(closest, ((probe[:, None, :] - p[None, :, :])**2).sum(axis=2).min(axis=1))
+    return np.sqrt(closest.max())
+
+
+def bench_sampler(data_dir, n_samples):
+    """Reports collision-free samples per second and coverage of each sampling sequence.
+
+    Parameters
+    ----------
+    data_dir : str
+        directory with obstacles.csv (ending in /)
+    n_samples : int
+        number of samples drawn per sampler
+    """
+
+    print(f"{'sampler':>10} {'samples/s':>12} {'dispersion':>11}")
+    for name in ('legacy', 'uniform', 'halton', 'sobol'):
+        if name == 'legacy':
+            planner = SamplingPlanner(data_dir, data_dir)
+            sample = lambda: legacy_sample(planner)
+        else:
+            planner = SamplingPlanner(data_dir, data_dir, seed_=0, sampler_=name)
+            sample = planner._sample
+
+        start = time.perf_counter()
+        points = np.array([sample() for _ in range(n_samples)])
+        elapsed = time.perf_counter() - start
+
+        print(f"{name:>10} {n_samples/elapsed:>12.0f} {dispersion(planner, points):>11.4f}")
+
+
+def bench_prm(data_dir, sizes, k, workers):
+    """Reports PRM roadmap build time, load time from the saved roadmap and query time.
+
+    Parameters
+    ----------
+    data_dir : str
+        directory with obstacles.csv (ending in /)
+    sizes : list of int
+        roadmap sizes N to benchmark
+    k : int
+        number of nearest neighbors each node is connected to
+    workers : int
+        number of worker processes for the build
+    """
+
+    print(f"{'N':>10} {'edges':>10} {'build [s]':>10} {'load [s]':>10} {'query [ms]':>11}")
+    for N in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            roadmap = tmp + os.sep + 'roadmap.npz'
+
+            start = time.perf_counter()
+            prm = PRM(data_dir, tmp + os.sep, N=N, k=k, workers=workers, roadmap=roadmap, seed_=0)
+            build = time.perf_counter() - start
+
+            start = time.perf_counter()
+            PRM(data_dir, tmp + os.sep, N=N, k=k, workers=workers, roadmap=roadmap, seed_=0)
+            load = time.perf_counter() - start
+
+        start = time.perf_counter()
+        prm.plan_prm(prm.start_pos, prm.goal_pos)
+        query = 1000 * (time.perf_counter() - start)
+
+        print(f"{N:>10} {len(prm.indices) // 2:>10} {build:>10.3f} {load:>10.3f} {query:>11.2f}")
+
+
+def bench_rrt_star(data_dir, iterations, seeds):
+    """Reports path cost and wall time of RRT* and informed RRT* against iteration count, next to RRT.
+
+    Parameters
+    ----------
+    data_dir : str
+        directory with obstacles.csv (ending in /)
+    iterations : list of int
+        iteration counts to run RRT* for
+    seeds : int
+        number of seeds to average over
+    """
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rrt = [RRT(data_dir, tmp + os.sep, seed_=seed) for seed in range(seeds)]
+        cost = np.mean([p.tree.cost[p.path[-1]] for p in rrt])
+        print(f"RRT first path cost: {cost:.4f}, averaged over {seeds} seeds\n")
+
+        print(f"{'iterations':>10} {'RRT* cost':>10} {'RRT* [s]':>9} {'informed cost':>14} {'informed [s]':>13}")
+        for n in iterations:
+            results = []
+            for informed in (False, True):
+                costs, elapsed = [], 0.0
+                for seed in range(seeds):
+                    start = time.perf_counter()
+                    planner = RRTStar(data_dir, tmp + os.sep, iterations=n, informed=informed, seed_=seed)
+                    elapsed += time.perf_counter() - start
+                    costs.append(planner.tree.cost[planner.path[-1]] if planner.path else np.inf)
+                results += [np.mean(costs), elapsed / seeds]
+            print(f"{n:>10} {results[0]:>10.4f} {results[1]:>9.3f} {results[2]:>14.4f} {results[3]:>13.3f}")
+
+
+def bench_connect(gaps, seeds, max_size):
+    """Reports time to first solution of RRT and RRT-Connect through a narrow passage.
+
+    Parameters
+    ----------
+    gaps : list of float
+        passage widths to benchmark
+    seeds : int
+        number of seeded runs per planner and passage
+    max_size : int
+        node limit of each run, runs that hit it count as failures
+    """
+
+    print(f"{'gap':>6} {'planner':>11} {'solved':>7} {'mean [s]':>9} {'std [s]':>8} {'nodes':>8}")
+    for gap in gaps:
+        with tempfile.TemporaryDirectory() as tmp:
+            write_passage(tmp + os.sep, gap)
+            for name, planner in (('RRT', RRT), ('RRTConnect', RRTConnect)):
+                times, nodes = [], []
+                for seed in range(seeds):
+                    start = time.perf_counter()
+                    p = planner(tmp + os.sep, tmp + os.sep, max_size=max_size, seed_=seed)
+                    if p.path:
+                        times.append(time.perf_counter() - start)
+                        nodes.append(len(p._positions()))
+                mean, std = (np.mean(times), np.std(times)) if times else (np.nan, np.nan)
+                print(f"{gap:>6.3f} {name:>11} {len(times):>3}/{seeds:<3} {mean:>9.3f} {std:>8.3f} {np.mean(nodes or [np.nan]):>8.0f}")
+
+
+def bench_lazy(data_dir, seeds, max_size, N, k):
+    """Reports segment checks and time of RRT and PRM runs with eager and lazy collision checking.
+
+    Parameters
+    ----------
+    data_dir : str
+        directory with obstacles.csv (ending in /)
+    seeds : int
+        number of seeded runs per planner and mode
+    max_size : int
+        RRT node limit
+    N, k : int
+        PRM roadmap size and nearest neighbors connected per node
+    """
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, planner, kwargs in (('RRT', RRT, dict(max_size=max_size)), ('PRM', PRM, dict(N=N, k=k, workers=1))):
+            for lazy in (False, True):
+                checks, times, solved = [], [], 0
+                for seed in range(seeds):
+                    start = time.perf_counter()
+                    p = planner(data_dir, tmp + os.sep, seed_=seed, lazy_=lazy, **kwargs)
+                    times.append(time.perf_counter() - start)
+                    checks.append(p.segment_checks)
+                    solved += bool(p.path)
+                results.append((name, 'lazy' if lazy else 'eager', solved, np.mean(checks), np.mean(times)))
+
+    print(f"{'planner':>8} {'mode':>6} {'solved':>7} {'checks':>10} {'time [s]':>9}")
+    for name, mode, solved, checks, t in results:
+        print(f"{name:>8} {mode:>6} {solved:>3}/{seeds:<3} {checks:>10.0f} {t:>9.4f}")
+
+
+def bench_reuse(data_dir, n_goals, max_size, seed=0):
+    """Reports per-query latency of a fresh RRT per goal against one RRT tree reused for every goal.
+
+    Parameters
+    ----------
+    data_dir : str
+        directory with obstacles.csv (ending in /)
+    n_goals : int
+        number of random collision-free goals queried in sequence
+    max_size : int
+        nodes a tree may grow by per goal
+    seed : int
+        seed of the goals and planners
+    """
+
+    with tempfile.TemporaryDirectory() as tmp:
+        reused = {mode: RRT(data_dir, tmp + os.sep, max_size=max_size, seed_=seed, plan=False, lazy_=(mode == 'lazy'))
+                  for mode in ('reused', 'lazy')}
+        planner = reused['reused']
+        rng = np.random.default_rng(seed)
+        goals = planner.C[:, 0] + rng.random((4 * n_goals, 2)) * (planner.C[:, 1] - planner.C[:, 0])
+        goals = goals[~planner._points_in_collision(goals)][:n_goals]
+
+        results = {'fresh': [], 'reused': [], 'lazy': []}
+        for i, goal in enumerate(goals):
+            start = time.perf_counter()
+            fresh = RRT(data_dir, tmp + os.sep, goal_=goal, max_size=max_size, seed_=seed + i, plan=False)
+            fresh.plan_rrt()
+            results['fresh'].append((time.perf_counter() - start, bool(fresh.path), len(fresh.tree)))
+
+            for mode, planner in reused.items():
+                start = time.perf_counter()
+                solution = planner.query(goal)
+                results[mode].append((time.perf_counter() - start, solution is not None, len(planner.tree)))
+
+                # every returned path must be collision-free, segment by segment
+                if solution is not None:
+                    for a, b in zip(solution.path[:-1], solution.path[1:]):
+                        assert not planner._is_in_collision_line(a, b), f"{mode} query {i} returned a colliding path"
+
+    print(f"{'mode':>7} {'solved':>9} {'mean [ms]':>10} {'p50 [ms]':>9} {'p90 [ms]':>9} {'first [ms]':>11} {'nodes':>7}")
+    for mode, runs in results.items():
+        latency = 1000 * np.array([r[0] for r in runs])
+        solved = sum(r[1] for r in runs)
+        print(f"{mode:>7} {solved:>4}/{len(runs):<4} {latency.mean():>10.2f} {np.percentile(latency, 50):>9.2f} "
+              f"{np.percentile(latency, 90):>9.2f} {latency[0]:>11.2f} {runs[-1][2]:>7}")
+
+
+def bench_grid(data_dir, resolutions, seeds, max_size):
+    """Reports occupancy grid build time, JPS query time and path cost at several resolutions, against RRT.
+
+    Parameters
+    ----------
+    data_dir : str
+        directory with obstacles.csv (ending in /)
+    resolutions : list of float
+        grid cell sizes to benchmark
+    seeds : int
+        number of seeded RRT runs
+    max_size : int
+        RRT node limit
+    """
+
+    path_cost = lambda pos, path: float(np.hypot(*(pos[path[1:]] - pos[path[:-1]]).T).sum())
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for resolution in resolutions:
+            grid = GridPlanner(data_dir, tmp + os.sep, resolution=resolution)
+            start = time.perf_counter()
+            grid.rasterize()
+            build = time.perf_counter() - start
+            start = time.perf_counter()
+            grid.plan_jps(grid.start_pos, grid.goal_pos)
+            query = time.perf_counter() - start
+            cost = path_cost(grid._positions(), grid.path) if grid.path else np.nan
+            rows.append((f"JPS {resolution:g}", f"{grid.shape[0]}x{grid.shape[1]}", build, query, cost, grid.expanded))
+
+        times, costs = [], []
+        for seed in range(seeds):
+            rrt = RRT(data_dir, tmp + os.sep, max_size=max_size, seed_=seed, plan=False)
+            start = time.perf_counter()
+            rrt.plan_rrt()
+            times.append(time.perf_counter() - start)
+            costs.append(path_cost(rrt.tree.pos, rrt.path) if rrt.path else np.nan)
+        rows.append(("RRT", f"{seeds} seeds", np.nan, np.mean(times), np.nanmean(costs), np.nan))
+
+    print(f"{'planner':>12} {'grid':>10} {'build [ms]':>11} {'query [ms]':>11} {'cost':>7} {'expanded':>9}")
+    for name, shape, build, query, cost, expanded in rows:
+        print(f"{name:>12} {shape:>10} {1000 * build:>11.2f} {1000 * query:>11.2f} {cost:>7.4f} {expanded:>9.0f}")
+
+
+def bench_knn(data_dir, sizes, legacy_max, window):
+    """Reports RRT iterations per second as the tree grows, with the spatial index and the legacy sort.
+
+    Iterations per second are measured over a window of nodes added after the
+    tree reaches each size.
+
+    Parameters
+    ----------
+    data_dir : str
+        directory with obstacles.csv (ending in /)
+    sizes : list of int
+        tree sizes to measure at
+    legacy_max : int
+        largest tree size to measure the legacy sort at
+    window : int
+        number of nodes added per measurement
+    """
+
+    print(f"{'nodes':>10} {'index [it/s]':>13} {'legacy [it/s]':>14}")
+    planners = {name: SamplingPlanner(data_dir, data_dir, seed_=0) for name in ('index', 'legacy')}
+    for size in sorted(sizes):
+        rates = []
+        for name, nearest in (('index', index_nearest), ('legacy', legacy_nearest)):
+            planner = planners[name]
+            if name == 'legacy' and size > legacy_max:
+                rates.append(None)
+                continue
+
+            grow(planner, size, nearest)
+            start = time.perf_counter()
+            grow(planner, size + window, nearest)
+            rates.append(window / (time.perf_counter() - start))
+
+        legacy = f"{rates[1]:>14.0f}" if rates[1] is not None else f"{'-':>14}"
+        print(f"{size:>10} {rates[0]:>13.0f} {legacy}")
+
+
+if __name__ == "__main__":
+
+    # parse command line args
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-path_to_data",    default="../results/")
+    parser.add_argument("-suite",           choices=["knn", "collision", "sampler", "prm", "rrtstar", "connect", "lazy", "reuse", "grid"], default="knn")
+    parser.add_argument("-sizes",           nargs="+", type=int, default=[1000, 10000, 100000])
+    parser.add_argument("-legacy_max",      type=int, default=10000)
+    parser.add_argument("-window",          type=int, default=1000)
+    parser.add_argument("-obstacles",       nargs="+", type=int, default=[10, 100, 1000, 10000])
+    parser.add_argument("-checks",          type=int, default=2000)
+    parser.add_argument("-loop_max",        type=int, default=1000)
+    parser.add_argument("-samples",         type=int, default=2000)
+    parser.add_argument("-N",               type=int, default=2000)
+    parser.add_argument("-k",               type=int, default=10)
+    parser.add_argument("-workers",         type=int, default=None)
+    parser.add_argument("-iterations",      nargs="+", type=int, default=[500, 1000, 2000, 4000])
+    parser.add_argument("-seeds",           type=int, default=3)
+    parser.add_argument("-gaps",            nargs="+", type=float, default=[0.06, 0.03, 0.015])
+    parser.add_argument("-max_size",        type=int, default=20000)
+    parser.add_argument("-goals",           type=int, default=50)
+    parser.add_argument("-resolutions",     nargs="+", type=float, default=[0.02, 0.01, 0.005, 0.0025])
+    args = parser.parse_args()
+
+    if args.suite == "knn":
+        bench_knn(args.path_to_data, args.sizes, args.legacy_max, args.window)
+    elif args.suite == "collision":
+        bench_collision(args.obstacles, args.checks, args.loop_max)
+    elif args.suite == "sampler":
+        bench_sampler(args.path_to_data, args.samples)
+    elif args.suite == "prm":
+        bench_prm(args.path_to_data, args.sizes, args.k, args.workers)
+    elif args.suite == "rrtstar":
+        bench_rrt_star(args.path_to_data, args.iterations, args.seeds)
+    elif args.suite == "connect":
+        bench_connect(args.gaps, args.seeds, args.max_size)
+    elif args.suite == "lazy":
+        bench_lazy(args.path_to_data, args.seeds, args.max_size, args.N, args.k)
+    elif args.suite == "reuse":
+        bench_reuse(args.path_to_data, args.goals, args.max_size)
+    elif args.suite == "grid":
+        bench_grid(args.path_to_data, args.resolutions, args.seeds, args.max_size)
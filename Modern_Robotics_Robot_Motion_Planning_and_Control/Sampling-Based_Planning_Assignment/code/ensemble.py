@@ -0,0 +1,134 @@
+import contextlib
+import csv
+import io
+import os
+import shutil
+import tempfile
+import time
+from multiprocessing import Pool, TimeoutError
+
+import numpy as np
+
+
+def _run_seed(task):
+    """Runs one seeded planner in a worker process, writing its output to its own directory.
+
+    Returns
+    -------
+    stats : dict
+        seed, status ('solved' or 'failed'), seconds, nodes and path cost of the run
+    """
+
+    planner, data_dir, out_dir, seed, kwargs = task
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        p = planner(data_dir, out_dir, seed_=seed, **kwargs)
+    elapsed = time.perf_counter() - start
+
+    pos = p._positions()
+    cost = float(np.hypot(*(pos[p.path[1:]] - pos[p.path[:-1]]).T).sum()) if p.path else np.inf
+    return {'seed': seed, 'status': 'solved' if p.path else 'failed', 'time': elapsed,
+            'nodes': len(pos), 'cost': cost, 'dir': out_dir}
+
+
+def run_ensemble(planner, data_dir, out_dir, n_seeds, seed=None, processes=None, deadline=None, select='first', **kwargs):
+    """Runs independently seeded planners across a process pool and keeps the best path.
+
+    Every run writes to its own temporary directory, the selected run's files
+    are copied to out_dir. Runs still going when the selection is made are
+    cancelled by terminating the pool.
+
+    Parameters
+    ----------
+    planner : class
+        SamplingPlanner subclass that plans and saves its output when constructed
+    data_dir, out_dir : str
+        paths to the obstacle data and output directories (ending in /)
+    n_seeds : int
+        number of planners to run
+    seed : int
+        seed the run seeds are derived from, None for fresh ones
+    processes : int
+        number of worker processes, defaults to the number of CPUs
+    deadline : float
+        seconds after which runs that have not finished are cancelled, None to wait for all
+    select : str
+        'first' keeps the first path found and cancels the rest, 'cheapest' keeps
+        the cheapest path found by the deadline
+    kwargs
+        passed on to the planner
+
+    Returns
+    -------
+    best : dict
+        stats of the selected run, None if no run found a path
+    stats : list of dict
+        stats of every run by seed, status 'cancelled' for runs that did not finish
+    """
+
+    seeds = np.random.SeedSequence(seed).generate_state(n_seeds).tolist()
+    processes = min(processes or os.cpu_count(), n_seeds)
+    tmp = tempfile.mkdtemp()
+    tasks = [(planner, data_dir, tmp + os.sep + f"{s}" + os.sep, s, kwargs) for s in seeds]
+    for task in tasks:
+        os.mkdir(task[2])
+
+    stats = {s: {'seed': s, 'status': 'cancelled', 'time': np.nan, 'nodes': 0, 'cost': np.inf} for s in seeds}
+    best = None
+    start = time.perf_counter()
+    try:
+        with Pool(processes) as pool:
+            results = pool.imap_unordered(_run_seed, tasks)
+            for _ in range(n_seeds):
+                timeout = None if deadline is None else max(deadline - (time.perf_counter() - start), 0.0)
+                try:
+                    result = results.next(timeout)
+                except TimeoutError:
+                    break
+
+                stats[result['seed']] = result
+                if result['status'] == 'solved' and (best is None or result['cost'] < best['cost']):
+                    best = result
+                    if select == 'first':
+                        break
+
+        # leaving the with block terminated any runs still going
+        if best is not None:
+            for name in os.listdir(best['dir']):
+                shutil.copy(best['dir'] + name, out_dir + name)
+    finally:
+        shutil.rmtree(tmp)
+
+    stats = [stats[s] for s in seeds]
+    for s in stats:
+        s.pop('dir', None)
+    return best, stats
+
+
+def save_stats(stats, file):
+    """Saves per-seed ensemble stats as csv [seed,status,time,nodes,cost]
+
+    Parameters
+    ----------
+    stats : list of dict
+        stats returned by run_ensemble
+    file : str
+        path of the file to write
+    """
+
+    with open(file, 'w') as stats_file:
+        writer = csv.writer(stats_file)
+        writer.writerow(['# seed', 'status', 'time', 'nodes', 'cost'])
+        for s in stats:
+            writer.writerow([s['seed'], s['status'], s['time'], s['nodes'], s['cost']])
+
+
+def summarize(stats):
+    """Gets a printable summary of solve rate and latency percentiles of finished runs"""
+    times = np.array([s['time'] for s in stats if s['status'] == 'solved'])
+    counts = {status: sum(s['status'] == status for s in stats) for status in ('solved', 'failed', 'cancelled')}
+    summary = ", ".join(f"{n} {status}" for status, n in counts.items())
+    if len(times):
+        p50, p90, p99 = np.percentile(times, [50, 90, 99])
+        summary += f"\nsolve time [s]: p50 {p50:.4f}, p90 {p90:.4f}, p99 {p99:.4f}, max {times.max():.4f}"
+    return summary
@@ -0,0 +1,259 @@
+from heapq import heappush, heappop
+from math import ceil, sqrt, inf
+
+from sampling_planners import *
+
+
+SQRT2 = sqrt(2)
+
+
+class GridPlanner(SamplingPlanner):
+    """Occupancy grid planner, A* with Jump Point Search (JPS) on the implicit 8-connected grid
+
+    The obstacles are rasterized into a grid of square cells. A cell is
+    occupied if any part of it lies within an obstacle grown by the robot
+    radius, so every straight move between the centers of free cells is
+    collision-free. Diagonal moves need both cells they pass between to be
+    free. No edge lists are built: JPS scans the grid in straight and
+    diagonal lines from each expanded cell, and only pushes the jump points
+    where the optimal path may turn. The output lists the path's positions
+    as nodes, from the start through the jump points to the goal.
+    """
+
+    def __init__(self, data_dir, out_dir, resolution=0.01, robot_radius=0.0, *args, **kwargs):
+        """
+        Parameters
+        ----------
+        data_dir, out_dir : str
+            paths to the obstacle data and output directories (ending in /)
+        resolution : float
+            side length of a grid cell
+        robot_radius : float
+            radius the obstacles are inflated by
+        """
+
+        # calls base class constructor
+        super().__init__(data_dir, out_dir, *args, **kwargs)
+        self.resolution = resolution
+        self.robot_radius = robot_radius
+
+        # builds the occupancy grid and runs query between start and goal
+        self.rasterize()
+        self.plan_jps(self.start_pos, self.goal_pos)
+
+        # record path
+        if self.trace is not None:
+            pos = self._positions()
+            self.trace.edges(pos[:-1], pos[1:])
+            self._trace_path()
+            self._finish_trace()
+
+        # saves planner data
+        self._save_data(out_dir)
+
+    def rasterize(self):
+        """Builds self.grid, a bool array over the cells of C that is True where a cell is occupied.
+
+        A cell is tested by its center against the obstacles grown by the
+        robot radius and half the cell diagonal, with one vectorized check
+        over every cell.
+        """
+
+        self.shape = tuple(int(ceil((hi - lo) / self.resolution - 1e-9)) for lo, hi in self.C)
+        i, j = np.meshgrid(np.arange(self.shape[0]), np.arange(self.shape[1]), indexing='ij')
+        centers = self.C[:, 0] + (np.stack((i.ravel(), j.ravel()), axis=1) + 0.5) * self.resolution
+
+        grown = ObstacleGrid(self.obs_xy, np.sqrt(self.obs_r2) + self.robot_radius + self.resolution / SQRT2)
+        self.grid = grown.points(centers).reshape(self.shape)
+
+        # free cells as a flat bytearray with a border of occupied cells, so scans never leave the grid
+        padded = np.zeros((self.shape[0] + 2, self.shape[1] + 2), dtype=np.uint8)
+        padded[1:-1, 1:-1] = ~self.grid
+        self._free = bytearray(padded.tobytes())
+        self._width = self.shape[1] + 2
+
+    def _cell(self, pos):
+        """Gets the flat padded index of the cell holding a position, None if it is outside C"""
+        if not ((self.C[:, 0] <= pos) & (pos <= self.C[:, 1])).all():
+            return None
+
+        # positions on the upper bounds belong to the last cells
+        i, j = (min(int((pos[d] - self.C[d, 0]) // self.resolution), self.shape[d] - 1) for d in (0, 1))
+        return (i + 1) * self._width + j + 1
+
+    def _center(self, c):
+        """Gets the x,y of the center of a cell from its flat padded index"""
+        i, j = divmod(c, self._width)
+        return self.C[:, 0] + (np.array([i, j]) - 0.5) * self.resolution
+
+    def _jump_straight(self, c, step, side, goal):
+        """Scans from cell c in a straight line, returns the first jump point or None if blocked.
+
+        Parameters
+        ----------
+        c : int
+            cell to start scanning at
+        step : int
+            index offset of one move along the line
+        side : int
+            index offset of one move across the line
+        goal : int
+            goal cell
+        """
+
+        free = self._free
+        while free[c]:
+            if c == goal:
+                return c
+
+            # forced neighbor, a cell beside the line that is only reachable optimally through c
+            if (free[c + side] and not free[c + side - step]) or (free[c - side] and not free[c - side - step]):
+                return c
+            c += step
+        return None
+
+    def _jump(self, c, h, v, goal):
+        """Scans from cell c along the move h + v, returns the first jump point or None if blocked.
+
+        Parameters
+        ----------
+        c : int
+            cell to start scanning at
+        h, v : int
+            index offsets of the move's x and y components, either can be 0
+        goal : int
+            goal cell
+        """
+
+        if not (h and v):
+            return self._jump_straight(c, h or v, 1 if h else self._width, goal)
+
+        free = self._free
+        while free[c]:
+            if c == goal:
+                return c
+
+            # a jump point on either straight line makes c one as well
+            if self._jump_straight(c + h, h, 1, goal) is not None or self._jump_straight(c + v, v, self._width, goal) is not None:
+                return c
+
+            # diagonal moves may not cut corners
+            if not (free[c + h] and free[c + v]):
+                return None
+            c += h + v
+        return None
+
+    def _moves(self, c, parent):
+        """Gets the (h, v) moves worth scanning from cell c, pruned by the direction it was reached from"""
+
+        free, w = self._free, self._width
+        if parent is None:
+            straight = [(h, v) for h, v in ((w, 0), (-w, 0), (0, 1), (0, -1)) if free[c + h + v]]
+            diagonal = [(h, v) for h in (w, -w) for v in (1, -1) if free[c + h] and free[c + v]]
+            return straight + diagonal
+
+        # direction of the move into c, as unit steps
+        di, dj = c // w - parent // w, c % w - parent % w
+        h = w * ((di > 0) - (di < 0))
+        v = (dj > 0) - (dj < 0)
+
+        moves = []
+        if h and v:
+            if free[c + v]: moves.append((0, v))
+            if free[c + h]: moves.append((h, 0))
+            if free[c + h] and free[c + v]: moves.append((h, v))
+        elif h:
+            if free[c + h]:
+                moves.append((h, 0))
+                moves += [(h, s) for s in (1, -1) if free[c + s]]
+            moves += [(0, s) for s in (1, -1) if free[c + s]]
+        else:
+            if free[c + v]:
+                moves.append((0, v))
+                moves += [(s, v) for s in (w, -w) if free[c + s]]
+            moves += [(s, 0) for s in (w, -w) if free[c + s]]
+        return moves
+
+    def plan_jps(self, start, goal):
+        """Plans a path over the occupancy grid with A* and Jump Point Search.
+
+        Parameters
+        ----------
+        start, goal : float 2-tuples
+            x,y of the start and goal
+
+        Returns
+        -------
+        path : list of int
+            flat cell indices of the start, jump points and goal, empty if no path exists
+        """
+
+        self.query_pos = np.array([start, goal], dtype=float)
+        self.expanded = 0
+        self.path = []
+        self.cells = []
+        s, t = self._cell(start), self._cell(goal)
+        if s is None or t is None or not (self._free[s] and self._free[t]):
+            print("Start or goal is in an occupied cell or outside the grid. Try a finer resolution?")
+            return self.cells
+
+        w = self._width
+        ti, tj = divmod(t, w)
+
+        def h(c):
+            """octile distance to the goal in cells"""
+            di, dj = abs(c // w - ti), abs(c % w - tj)
+            return max(di, dj) + (SQRT2 - 1) * min(di, dj)
+
+        g = {s: 0.0}
+        parent = {s: None}
+        closed = set()
+        count = 0
+        openSet = [(h(s), count, s)]
+        while openSet:
+            _, _, c = heappop(openSet)
+            if c in closed:
+                continue
+            if c == t:
+                while c is not None:
+                    self.cells.append(c)
+                    c = parent[c]
+                self.cells.reverse()
+                break
+            closed.add(c)
+            self.expanded += 1
+
+            ci, cj = divmod(c, w)
+            for dh, dv in self._moves(c, parent[c]):
+                jp = self._jump(c + dh + dv, dh, dv, t)
+                if jp is None or jp in closed:
+                    continue
+
+                # jump points lie on a straight or diagonal line from c
+                di, dj = abs(jp // w - ci), abs(jp % w - cj)
+                temp_score = g[c] + max(di, dj) + (SQRT2 - 1) * min(di, dj)
+                if temp_score < g.get(jp, inf):
+                    g[jp] = temp_score
+                    parent[jp] = c
+                    count += 1
+                    heappush(openSet, (temp_score + h(jp), count, jp))
+
+        if self.cells:
+            # ids of the positions from the start through the cell centers to the goal
+            self.path = list(range(len(self._positions())))
+            print("Path to goal found : " , [id_ + 1 for id_ in self.path])
+        else:
+            print("No path found through the occupancy grid. Try a finer resolution?")
+        return self.cells
+
+    def _positions(self):
+        """Gets the x,y of the start, the centers of the path's cells and the goal"""
+        if not self.cells:
+            return self.query_pos[:1]
+        return np.concatenate((self.query_pos[:1], [self._center(c) for c in self.cells], self.query_pos[1:]))
+
+    def _edges(self):
+        """Gets the edges between consecutive path positions"""
+        pos = self._positions()
+        id1 = np.arange(len(pos) - 1)
+        return id1, id1 + 1, np.hypot(*(pos[1:] - pos[:-1]).T)
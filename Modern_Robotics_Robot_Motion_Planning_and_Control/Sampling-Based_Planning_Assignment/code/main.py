@@ -1,7 +1,13 @@
 import argparse
 import time
-from rrt import RRT
-# from prm import PRM
+from rrt import RRT, load_goals
+from rrt_star import RRTStar
+from rrt_connect import RRTConnect
+from prm import PRM
+from grid_planner import GridPlanner
+from plan_trace import Trace, Renderer
+from ensemble import run_ensemble, save_stats, summarize
+from output import save_paths
 
 if __name__ == "__main__":
 
@@ -12,19 +18,94 @@ if __name__ == "__main__":
     parser.add_argument("-path_to_data",    default="../results/")
     parser.add_argument("-path_to_output",  default="../results/")
     parser.add_argument("-visualize",       action="store_true")
-    parser.add_argument("-method",          choices=["RRT", "PRM"], default="RRT")
+    parser.add_argument("-method",          choices=["RRT", "RRTstar", "RRTConnect", "PRM", "JPS"], default="RRT")
     parser.add_argument("-step",            default=0.05, type=float)
+    parser.add_argument("-max_size",        default=500, type=int)
+    parser.add_argument("-seed",            default=None, type=int)
+    parser.add_argument("-sampler",         choices=["uniform", "halton", "sobol"], default="uniform")
+    parser.add_argument("-N",               default=500, type=int)
+    parser.add_argument("-k",               default=10, type=int)
+    parser.add_argument("-workers",         default=None, type=int)
+    parser.add_argument("-roadmap",         default=None)
+    parser.add_argument("-iterations",      default=2000, type=int)
+    parser.add_argument("-informed",        action="store_true")
+    parser.add_argument("-ensemble",        default=0, type=int)
+    parser.add_argument("-select",          choices=["first", "cheapest"], default="first")
+    parser.add_argument("-deadline",        default=None, type=float)
+    parser.add_argument("-binary",          action="store_true")
+    parser.add_argument("-trace",           default=None)
+    parser.add_argument("-replay",          default=None)
+    parser.add_argument("-lazy",            action="store_true")
+    parser.add_argument("-goals",           default=None)
+    parser.add_argument("-resolution",      default=0.01, type=float)
+    parser.add_argument("-robot_radius",    default=0.0, type=float)
     args = parser.parse_args()
 
+    # draw a saved trace instead of planning
+    if args.replay:
+        Renderer(Trace.load(args.replay)).replay()
+        input("Press any button to continue...\n")
+        exit()
+
+    common = dict(data_dir=args.path_to_data, out_dir=args.path_to_output, viz_=args.visualize, sampler_=args.sampler,
+                  binary_=args.binary, trace_=args.trace)
     if args.method == "RRT":
-        RRT(data_dir=args.path_to_data, out_dir=args.path_to_output, viz_=args.visualize, step_=args.step)
+        planner, kwargs = RRT, dict(step_=args.step, max_size=args.max_size, lazy_=args.lazy)
+    elif args.method == "RRTConnect":
+        planner, kwargs = RRTConnect, dict(step_=args.step, max_size=args.max_size)
+    elif args.method == "RRTstar":
+        planner, kwargs = RRTStar, dict(step_=args.step, iterations=args.iterations, informed=args.informed)
     elif args.method == "PRM":
-        print("PRM not implemented!")
-        # PRM(data_dir=args.path_to_data, out_dir=args.path_to_output, viz_=args.visualize, N=500)
+        planner, kwargs = PRM, dict(N=args.N, k=args.k, workers=args.workers, roadmap=args.roadmap, lazy_=args.lazy)
+    elif args.method == "JPS":
+        planner, kwargs = GridPlanner, dict(resolution=args.resolution, robot_radius=args.robot_radius)
     else:
-        print("Choose RRT or PRM for method")
+        print("Choose RRT, RRTstar, RRTConnect, PRM or JPS for method")
         exit()
 
+    # lazy collision checking is only implemented by RRT and PRM
+    if args.lazy and planner not in (RRT, PRM):
+        parser.error("-lazy is only supported with -method RRT or PRM")
+
+    # only an RRT tree can be reused across goals
+    if args.goals and planner is not RRT:
+        parser.error("-goals is only supported with -method RRT")
+    if args.goals and args.ensemble:
+        parser.error("-goals cannot be combined with -ensemble")
+
+    if args.ensemble:
+        # each run is single process and draws nothing on screen
+        common['viz_'], common['trace_'] = False, None
+        if planner is PRM: kwargs['workers'] = 1
+        best, stats = run_ensemble(planner, n_seeds=args.ensemble, seed=args.seed, processes=args.workers,
+                                   deadline=args.deadline, select=args.select, **common, **kwargs)
+        save_stats(stats, args.path_to_output + "ensemble.csv")
+        if best is None:
+            print("No run found a path.")
+        else:
+            print(f"Path from seed {best['seed']} selected, cost {best['cost']:.4f}")
+        print(summarize(stats))
+    elif args.goals:
+        # one tree from the start, reused for every goal
+        p = planner(seed_=args.seed, plan=False, **common, **kwargs)
+        paths = []
+        for goal in load_goals(args.goals):
+            query_start = time.time()
+            solution = p.query(goal, args.deadline)
+            print(f"Goal {goal} : " + (f"path cost {solution.cost:.4f}" if solution else "no path found") + f" in {time.time() - query_start:.4f}s")
+            paths.append([id_ + 1 for id_ in p.path] if solution else [])
+        p.save(args.path_to_output)
+        save_paths(args.path_to_output, paths)
+    elif args.deadline is not None and planner in (RRT, RRTStar, RRTConnect):
+        # anytime planning, keeping the best path found before the deadline
+        p = planner(seed_=args.seed, plan=False, **common, **kwargs)
+        best = p.plan(args.deadline, lambda s: print(f"Iteration {s.iteration}, {s.time:.4f}s : path cost {s.cost:.4f}"))
+        if best is None:
+            print("No path found before the deadline.")
+        p.save(args.path_to_output)
+    else:
+        planner(seed_=args.seed, **common, **kwargs)
+
     end = time.time()
     print(f"Elapsed Time: {(end-start):.4f}s")
 
@@ -41,8 +41,11 @@ class Obstacle():
             True if line between two points would be invalid,
             False if line between two points would be valid
         """
-        return abs((b[0]-a[0])*self.x + (a[1]-b[1])*self.y + (a[0]-b[0])*b[1] + (b[1]-a[1])*a[0]) /\
-                    sqrt((b[0]-b[1])**2 + (a[1]-b[1])**2 + 0.0000001)< self.r
+        # closest point to the center on the segment, a + t*(b - a) with t clamped to [0, 1]
+        dx, dy = b[0] - a[0], b[1] - a[1]
+        length2 = dx**2 + dy**2
+        t = 0.0 if length2 == 0 else max(0.0, min(1.0, ((self.x - a[0])*dx + (self.y - a[1])*dy) / length2))
+        return sqrt((a[0] + t*dx - self.x)**2 + (a[1] + t*dy - self.y)**2) < self.r
 
     def __repr__(self):
         return (
@@ -0,0 +1,223 @@
+import numpy as np
+
+
+class ObstacleGrid():
+    """Uniform grid broad phase for collision checks against many circular obstacles.
+
+    Every obstacle is listed in each cell its bounding box overlaps, stored in
+    CSR form (cell offsets into one array of obstacle indices). A query only
+    runs the exact circle test against the obstacles listed in the cells it
+    touches, and all queries in a batch are expanded into (query, obstacle)
+    pairs with array operations.
+
+    ...
+
+    Attributes
+    ----------
+    lo : float 2 array
+        x,y of the grid's lower corner
+    cell : float
+        side length of a cell
+    shape : int 2-tuple
+        number of cells along x and y
+    offsets : int64 array
+        start of each cell's range in obs, length n_cells + 1
+    obs : int64 array
+        obstacle indices listed cell by cell
+
+    Methods
+    -------
+    point(pos), segment(a, b)
+        checks a single point or segment for collision
+    points(points)
+        checks many points for collision
+    segments(a, b)
+        checks many segments for collision
+    """
+
+    def __init__(self, xy, r, cell=None):
+        """
+        Parameters
+        ----------
+        xy : float Nx2 array
+            obstacle centers
+        r : float N array
+            obstacle radii
+        cell : float
+            cell side length, defaults to about one obstacle per cell but no
+            smaller than the average obstacle diameter
+        """
+
+        self.xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        self.r2 = np.asarray(r, dtype=float)**2
+        r = np.sqrt(self.r2)
+
+        if not len(r):
+            self.lo, self.cell, self.shape = np.zeros(2), 1.0, (1, 1)
+            self.offsets, self.obs = np.zeros(2, dtype=np.int64), np.zeros(0, dtype=np.int64)
+            self._lists()
+            return
+
+        self.lo = (self.xy - r[:, None]).min(axis=0)
+        hi = (self.xy + r[:, None]).max(axis=0)
+        extent = np.maximum(hi - self.lo, 1e-9)
+        self.cell = cell or max(np.sqrt(extent.prod() / len(r)), 2 * r.mean())
+        self.shape = tuple(int(n) for n in np.ceil(extent / self.cell).astype(np.int64).clip(1))
+
+        # (cell, obstacle) pairs for every cell in each obstacle's bounding box
+        i0, j0 = self._cells(self.xy - r[:, None]).T
+        i1, j1 = self._cells(self.xy + r[:, None]).T
+        cells, obs = self._expand(i0, j0, i1, j1)
+
+        order = np.argsort(cells, kind='stable')
+        self.obs = obs[order]
+        self.offsets = np.zeros(self.shape[0] * self.shape[1] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=self.shape[0] * self.shape[1]), out=self.offsets[1:])
+        self._lists()
+
+    def _lists(self):
+        """Keeps python list copies of the grid, single queries are faster on them than on arrays"""
+        offsets = self.offsets.tolist()
+        obs = self.obs.tolist()
+        xy, r2 = self.xy.tolist(), self.r2.tolist()
+        self._cell_obs = [[(*xy[o], r2[o]) for o in obs[offsets[c]:offsets[c+1]]] for c in range(len(offsets) - 1)]
+
+    def _cells(self, points):
+        """Gets the (i, j) cell of each point, clamped to the grid"""
+        ij = np.floor((points - self.lo) / self.cell).astype(np.int64)
+        return np.clip(ij, 0, np.array(self.shape) - 1)
+
+    def _expand(self, i0, j0, i1, j1):
+        """Expands cell boxes into (cell, box index) pairs.
+
+        Parameters
+        ----------
+        i0, j0, i1, j1 : int M arrays
+            inclusive cell range of each box
+
+        Returns
+        -------
+        cells : int64 array
+            flat index of each cell covered
+        owner : int64 array
+            index of the box covering it
+        """
+
+        ni, nj = i1 - i0 + 1, j1 - j0 + 1
+        counts = ni * nj
+        owner = np.repeat(np.arange(len(counts)), counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        i = i0[owner] + k // nj[owner]
+        j = j0[owner] + k % nj[owner]
+        return i * self.shape[1] + j, owner
+
+    def _candidates(self, cells, owner):
+        """Expands (cell, query) pairs into (query, obstacle) pairs for the obstacles in each cell"""
+        starts = self.offsets[cells]
+        counts = self.offsets[cells + 1] - starts
+        query = np.repeat(owner, counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return query, self.obs[np.repeat(starts, counts) + k]
+
+    def _cell(self, x, y):
+        """Gets the (i, j) cell of a single point, clamped to the grid"""
+        i = min(max(int((x - self.lo[0]) // self.cell), 0), self.shape[0] - 1)
+        j = min(max(int((y - self.lo[1]) // self.cell), 0), self.shape[1] - 1)
+        return i, j
+
+    def point(self, pos):
+        """Checks a single point for collision.
+
+        Parameters
+        ----------
+        pos : float 2-tuple
+            x,y position to check
+
+        Returns
+        -------
+        b : bool
+            True if the point is inside an obstacle
+        """
+
+        x, y = float(pos[0]), float(pos[1])
+        i, j = self._cell(x, y)
+        for ox, oy, r2 in self._cell_obs[i * self.shape[1] + j]:
+            if (x - ox)**2 + (y - oy)**2 < r2:
+                return True
+        return False
+
+    def segment(self, a, b):
+        """Checks a single segment for collision.
+
+        Parameters
+        ----------
+        a, b : float 2-tuples
+            end points of the segment
+
+        Returns
+        -------
+        b : bool
+            True if the segment passes through an obstacle
+        """
+
+        ax, ay, bx, by = float(a[0]), float(a[1]), float(b[0]), float(b[1])
+        dx, dy = bx - ax, by - ay
+        length2 = max(dx**2 + dy**2, 1e-300)
+        i0, j0 = self._cell(min(ax, bx), min(ay, by))
+        i1, j1 = self._cell(max(ax, bx), max(ay, by))
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                for ox, oy, r2 in self._cell_obs[i * self.shape[1] + j]:
+                    t = min(max(((ox - ax)*dx + (oy - ay)*dy) / length2, 0.0), 1.0)
+                    if (ax + t*dx - ox)**2 + (ay + t*dy - oy)**2 < r2:
+                        return True
+        return False
+
+    def points(self, points):
+        """Checks many points for collision.
+
+        Parameters
+        ----------
+        points : float Mx2 array
+            x,y positions to check
+
+        Returns
+        -------
+        b : bool M array
+            True where a point is inside an obstacle
+        """
+
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        i, j = self._cells(points).T
+        query, obs = self._candidates(i * self.shape[1] + j, np.arange(len(points)))
+
+        hit = ((points[query] - self.xy[obs])**2).sum(axis=1) < self.r2[obs]
+        return np.bincount(query[hit], minlength=len(points)) > 0
+
+    def segments(self, a, b):
+        """Checks many segments for collision, testing the obstacles in each segment's bounding box cells.
+
+        Parameters
+        ----------
+        a, b : float Mx2 arrays
+            end points of the segments to check
+
+        Returns
+        -------
+        b : bool M array
+            True where a segment passes through an obstacle
+        """
+
+        a = np.asarray(a, dtype=float).reshape(-1, 2)
+        b = np.asarray(b, dtype=float).reshape(-1, 2)
+        i0, j0 = self._cells(np.minimum(a, b)).T
+        i1, j1 = self._cells(np.maximum(a, b)).T
+        query, obs = self._candidates(*self._expand(i0, j0, i1, j1))
+
+        # closest point to each candidate center on its segment, a + t*(b - a) with t in [0, 1]
+        sa = a[query]
+        d = b[query] - sa
+        ac = self.xy[obs] - sa
+        t = np.clip((ac * d).sum(axis=1) / np.maximum((d**2).sum(axis=1), 1e-300), 0.0, 1.0)
+        hit = ((ac - t[:, None] * d)**2).sum(axis=1) < self.r2[obs]
+        return np.bincount(query[hit], minlength=len(a)) > 0
@@ -0,0 +1,242 @@
+import time
+from array import array
+from math import inf
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+
+
+# kinds of trace events
+SAMPLE, EDGE, PATH = 0, 1, 2
+
+
+class Trace():
+    """Compact in-memory record of what a planner did, for drawing live or later.
+
+    Each event is a kind and two x,y points, kept in typed arrays (33 bytes
+    an event), so recording costs about as much as adding a node. Samples and
+    path nodes only use the first point. The scene (bounds, obstacles, start
+    and goal) is kept with the events, so a saved trace can be replayed on
+    its own.
+
+    ...
+
+    Attributes
+    ----------
+    scene : dict of arrays
+        bounds, obs_xy, obs_r, start and goal of the planning problem
+
+    Methods
+    -------
+    sample(pos)
+        records a sample
+    edge(a, b)
+        records a new edge
+    edges(a, b)
+        records many new edges from Mx2 arrays
+    path(pos)
+        records the path through an Mx2 array of positions
+    events(lo, hi)
+        gets the kinds and points of events lo .. hi-1
+    save(file)
+        saves the trace as a .npz file
+    load(file)
+        loads a trace saved by save
+    """
+
+    def __init__(self, bounds, obs_xy, obs_r, start, goal):
+        """
+        Parameters
+        ----------
+        bounds : float 2x2 array
+            [[x_min, x_max], [y_min, y_max]] of the C-space
+        obs_xy : float Mx2 array
+            obstacle centers
+        obs_r : float M array
+            obstacle radii
+        start, goal : float 2-tuples
+            x,y of the start and goal
+        """
+
+        self.scene = {'bounds': np.asarray(bounds, dtype=float), 'obs_xy': np.asarray(obs_xy, dtype=float),
+                      'obs_r': np.asarray(obs_r, dtype=float), 'start': np.asarray(start, dtype=float),
+                      'goal': np.asarray(goal, dtype=float)}
+        self._kinds = array('B')
+        self._xy = array('d')
+
+    def __len__(self):
+        return len(self._kinds)
+
+    def sample(self, pos):
+        self._kinds.append(SAMPLE)
+        self._xy.extend((pos[0], pos[1], pos[0], pos[1]))
+
+    def edge(self, a, b):
+        self._kinds.append(EDGE)
+        self._xy.extend((a[0], a[1], b[0], b[1]))
+
+    def edges(self, a, b):
+        self._kinds.extend([EDGE] * len(a))
+        self._xy.extend(np.concatenate((a, b), axis=1).ravel().tolist())
+
+    def path(self, pos):
+        self._kinds.extend([PATH] * len(pos))
+        self._xy.extend(np.concatenate((pos, pos), axis=1).ravel().tolist())
+
+    def events(self, lo=0, hi=None):
+        """Gets events lo .. hi-1 as arrays.
+
+        Returns
+        -------
+        kinds : uint8 array
+            SAMPLE, EDGE or PATH for each event
+        xy : float64 Mx4 array
+            x0,y0,x1,y1 of each event
+        """
+
+        hi = len(self) if hi is None else hi
+        kinds = np.frombuffer(self._kinds, dtype=np.uint8)[lo:hi] if len(self) else np.zeros(0, dtype=np.uint8)
+        xy = np.frombuffer(self._xy, dtype=float).reshape(-1, 4)[lo:hi] if len(self) else np.zeros((0, 4))
+        return kinds.copy(), xy.copy()
+
+    def save(self, file):
+        """Saves the scene and events as a .npz file
+
+        Parameters
+        ----------
+        file : str
+            path of the file to write
+        """
+        kinds, xy = self.events()
+        np.savez(file, kinds=kinds, xy=xy, **self.scene)
+
+    @classmethod
+    def load(cls, file):
+        """Loads a trace saved by save
+
+        Parameters
+        ----------
+        file : str
+            path of the file to read
+
+        Returns
+        -------
+        trace : Trace
+        """
+
+        with np.load(file) as data:
+            trace = cls(data['bounds'], data['obs_xy'], data['obs_r'], data['start'], data['goal'])
+            trace._kinds.frombytes(data['kinds'].astype(np.uint8).tobytes())
+            trace._xy.frombytes(data['xy'].astype(float).tobytes())
+        return trace
+
+
+class Renderer():
+    """Draws a Trace with matplotlib, a batch of events at a time.
+
+    Each draw adds every event recorded since the last one to a single line
+    collection and a single scatter, then pauses once to refresh the window.
+    While planning, poll() only draws once interval seconds have passed since
+    the last draw, and waits longer when draws get slow, so drawing takes at
+    most a set share of the run however many events are recorded.
+
+    ...
+
+    Methods
+    -------
+    poll()
+        draws new events if it is time to
+    draw(hi)
+        draws the events up to hi
+    replay(batch, interval)
+        draws the whole trace a batch of events at a time
+    """
+
+    def __init__(self, trace, interval=0.1, share=0.2, ax=None):
+        """
+        Parameters
+        ----------
+        trace : Trace
+            trace to draw
+        interval : float
+            least seconds between draws while polling
+        share : float
+            largest share of the time while polling spent drawing
+        ax : matplotlib Axes
+            axes to draw on, a new figure showing the scene if None
+        """
+
+        self.trace = trace
+        self.interval = interval
+        self.share = share
+        self.ax = ax if ax is not None else self._init_axes()
+        self._drawn = 0
+        self._next = -inf
+        self._sample = None
+
+        # every edge and node drawn so far, held by one artist each
+        self._segments = np.zeros((0, 2, 2))
+        self._lines = self.ax.add_collection(LineCollection([], colors='k', linewidths=1, zorder=1))
+        self._nodes = self.ax.scatter([], [], c='k', s=1, zorder=1)
+
+    def _init_axes(self):
+        """Makes a figure showing the bounds, obstacles, start and goal of the trace's scene"""
+        scene = self.trace.scene
+        ax = plt.figure().gca()
+        ax.axis(scene['bounds'].ravel())
+
+        # obstacles
+        for (x, y), r in zip(scene['obs_xy'].tolist(), scene['obs_r'].tolist()):
+            ax.add_patch(plt.Circle((x, y), r, color=[0.5, 0.5, 0.5]))
+
+        # start and goal
+        ax.scatter(*scene['start'], c='g', marker='o')
+        ax.scatter(*scene['goal'], c='b', marker='o')
+        plt.pause(0.1)
+        return ax
+
+    def poll(self):
+        if time.perf_counter() >= self._next:
+            self.draw()
+
+    def draw(self, hi=None):
+        """Draws the events recorded since the last draw, up to hi (defaults to all)"""
+        start = time.perf_counter()
+        kinds, xy = self.trace.events(self._drawn, hi)
+        self._drawn += len(kinds)
+
+        # edges and their end nodes
+        edges = xy[kinds == EDGE]
+        if len(edges):
+            self._segments = np.concatenate((self._segments, edges.reshape(-1, 2, 2)))
+            self._lines.set_segments(self._segments)
+            self._nodes.set_offsets(self._segments[:, 1])
+
+        # only the latest sample is shown
+        samples = xy[kinds == SAMPLE]
+        if len(samples):
+            if self._sample is None:
+                self._sample = self.ax.scatter(*samples[-1, :2], color=[0.5, 0.0, 0.5], s=100)
+            self._sample.set_offsets(samples[-1:, :2])
+
+        # path
+        path = xy[kinds == PATH]
+        if len(path):
+            if self._sample is not None:
+                self._sample.remove()
+                self._sample = None
+            self.ax.scatter(path[:, 0], path[:, 1], c='r', marker='o', s=200, zorder=2)
+
+        plt.pause(0.001)
+
+        # the next draw waits long enough to keep drawing within its share of the time
+        now = time.perf_counter()
+        self._next = now + max(self.interval, (now - start) * (1 - self.share) / self.share)
+
+    def replay(self, batch=100, interval=0.05):
+        """Draws the whole trace, batch events at a time, at most one draw every interval seconds"""
+        for hi in range(self._drawn + batch, len(self.trace) + batch, batch):
+            start = time.perf_counter()
+            self.draw(min(hi, len(self.trace)))
+            time.sleep(max(interval - (time.perf_counter() - start), 0.0))
@@ -0,0 +1,332 @@
+import os
+from heapq import heappush, heappop
+from math import sqrt, inf
+from multiprocessing import Pool
+
+from sampling_planners import *
+
+
+# sequence points drawn per sampling task, fixed so a seed gives the same roadmap for any number of workers
+SAMPLE_CHUNK = 1024
+
+# sequence points drawn per requested roadmap node before sampling gives up, bounds the build when C is nearly full
+SAMPLE_LIMIT = 100
+
+# roadmap nodes connected per edge validation task
+CONNECT_CHUNK = 1024
+
+
+def _init_worker(obs_xy, obs_r, bounds=None, pos=None, k=None):
+    """Builds the obstacle grid, and the node index when connecting, once per worker process"""
+    global _worker_grid, _worker_pos, _worker_index, _worker_k
+    _worker_grid = ObstacleGrid(obs_xy, obs_r)
+    _worker_pos, _worker_k = pos, k
+    _worker_index = None
+    if pos is not None:
+        _worker_index = GridIndex(bounds)
+        for i, p in enumerate(pos.tolist()):
+            _worker_index.insert(i, p)
+
+
+def _sample_chunk(task):
+    """Gets the collision-free points among sequence points start+1 .. start+n in a worker process"""
+    bounds, seed, sequence, shift, start, n = task
+    sampler = Sampler(bounds, lambda points: ~_worker_grid.points(points), seed, sequence, block=n, start=start, shift=shift)
+    return sampler.draw()
+
+
+def _connect_chunk(task):
+    """Gets the edges from a range of roadmap rows to their k nearest nodes in a worker process, dropping colliding ones if check"""
+    lo, hi, check = task
+    pos, index = _worker_pos, _worker_index
+    pairs = [(min(i, j), max(i, j)) for i in range(lo, hi) for j in index.knn(_worker_k + 1, pos[i]) if j != i]
+    pairs = np.array(pairs, dtype=np.int64).reshape(-1, 2)
+    if check:
+        pairs = pairs[~_worker_grid.segments(pos[pairs[:, 0]], pos[pairs[:, 1]])]
+    return pairs
+
+
+class PRM(SamplingPlanner):
+    """Probabilistic roadmap (PRM) sampling-based algorithm
+
+    A roadmap of collision-free samples, each connected to its k nearest
+    neighbors by collision-free edges, is built once per scene across a
+    process pool and stored as a .npz file. Queries connect the start and goal
+    to the roadmap and search it with A*.
+
+    In lazy mode, roadmap edges are not checked while building. A query
+    checks only the unchecked edges on the path A* finds, drops those that
+    collide and searches again, until the path is collision-free.
+    """
+
+    # arrays that fully describe the roadmap, used to store it
+    ARRAYS = ('pos', 'offsets', 'indices', 'costs', 'checked')
+
+    def __init__(self, data_dir, out_dir, N=500, k=10, workers=None, roadmap=None, *args, **kwargs):
+        """
+        Parameters
+        ----------
+        data_dir, out_dir : str
+            paths to the obstacle data and output directories (ending in /)
+        N : int
+            number of roadmap nodes
+        k : int
+            number of nearest neighbors each node is connected to
+        workers : int
+            number of worker processes for the roadmap build, defaults to the number of CPUs
+        roadmap : str
+            .npz file to load the roadmap from, built and saved there if missing or
+            made for other obstacles, N or k
+        """
+
+        # calls base class constructor
+        super().__init__(data_dir, out_dir, *args, **kwargs)
+        self.N, self.k = N, k
+        self.workers = workers or os.cpu_count()
+
+        # loads or builds the roadmap
+        loaded = bool(roadmap) and self.load_roadmap(roadmap)
+        if not loaded:
+            self.build_roadmap()
+        checked = int(self.checked.sum())
+
+        # runs query between start and goal
+        self.plan_prm(self.start_pos, self.goal_pos)
+
+        # saves the roadmap once the query has checked its edges, so edges found to collide stay dropped
+        if roadmap and not (loaded and self.checked.sum() == checked):
+            self.save_roadmap(roadmap)
+
+        # record roadmap and path
+        if self.trace is not None:
+            self._trace_roadmap()
+            self._trace_path()
+            self._finish_trace()
+
+        # saves planner data
+        self._save_data(out_dir)
+
+    def _map(self, worker, tasks, initargs):
+        """Runs tasks across the process pool, or in this process with a single worker"""
+        if not tasks:
+            return []
+        if self.workers == 1 or len(tasks) == 1:
+            _init_worker(*initargs)
+            return [worker(task) for task in tasks]
+        with Pool(min(self.workers, len(tasks)), initializer=_init_worker, initargs=initargs) as pool:
+            return pool.map(worker, tasks, chunksize=1)
+
+    def build_roadmap(self):
+        """Samples N collision-free nodes and connects each to its k nearest neighbors in parallel"""
+
+        obs = (self.obs_xy, np.sqrt(self.obs_r2))
+
+        # sampling, chunks filter disjoint ranges of one shifted sequence, uniform chunks are seeded from the planner's generator
+        chunks, n_free, drawn = [np.zeros((0, 2))], 0, 0
+        limit = SAMPLE_CHUNK * int(np.ceil(SAMPLE_LIMIT * self.N / SAMPLE_CHUNK))
+        while n_free < self.N and drawn < limit:
+            # enough chunks for the remaining nodes at the free fraction seen so far
+            free = n_free / drawn if drawn else 1.0
+            n_chunks = int(np.ceil((self.N - n_free) / (SAMPLE_CHUNK * max(free, 0.01))))
+            n_chunks = min(n_chunks, (limit - drawn) // SAMPLE_CHUNK)
+            seeds = self.rng.integers(0, 2**63, n_chunks).tolist()
+            tasks = [(self.C, seed, self.sampler.sequence, self.sampler.shift, drawn + i * SAMPLE_CHUNK, SAMPLE_CHUNK)
+                     for i, seed in enumerate(seeds)]
+            chunks += self._map(_sample_chunk, tasks, obs)
+            n_free, drawn = sum(map(len, chunks)), drawn + n_chunks * SAMPLE_CHUNK
+
+        # print failure message, the roadmap is built from the samples found
+        if n_free < self.N:
+            print(f"Only {n_free} of {self.N} collision-free samples found in {drawn} draws. Is C almost fully occupied?")
+            self.N = n_free
+        self.pos = np.concatenate(chunks)[:self.N]
+
+        # k nearest edges, validated against obstacles unless lazy
+        tasks = [(lo, min(lo + CONNECT_CHUNK, self.N), not self.lazy) for lo in range(0, self.N, CONNECT_CHUNK)]
+        pairs = np.concatenate(self._map(_connect_chunk, tasks, obs + (self.C, self.pos, self.k)) + [np.zeros((0, 2), dtype=np.int64)])
+        pairs = np.unique(pairs, axis=0)
+        if not self.lazy:
+            self.segment_checks += self.N * min(self.k, self.N - 1)
+
+        # both directions of each edge in CSR form
+        rows = np.concatenate((pairs[:, 0], pairs[:, 1]))
+        cols = np.concatenate((pairs[:, 1], pairs[:, 0]))
+        order = np.argsort(rows, kind='stable')
+        self.indices = cols[order]
+        self.costs = np.hypot(*(self.pos[rows[order]] - self.pos[self.indices]).T)
+        self.offsets = np.zeros(self.N + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=self.N), out=self.offsets[1:])
+        self.checked = np.full(len(self.indices), not self.lazy)
+
+    def save_roadmap(self, file):
+        """Saves the roadmap, with the obstacles, N and k it was built for, as a .npz file
+
+        Parameters
+        ----------
+        file : str
+            path of the file to write
+        """
+        np.savez(file, obs_xy=self.obs_xy, obs_r2=self.obs_r2, N=self.N, k=self.k,
+                 **{name: getattr(self, name) for name in self.ARRAYS})
+
+    def load_roadmap(self, file):
+        """Loads a roadmap saved by save_roadmap if it was built for this scene, N and k
+
+        Parameters
+        ----------
+        file : str
+            path of the file to read
+
+        Returns
+        -------
+        b : bool
+            True if the roadmap was loaded
+        """
+
+        if not os.path.exists(file):
+            return False
+        with np.load(file) as data:
+            if not (all(name in data.files for name in self.ARRAYS) and np.array_equal(data['obs_xy'], self.obs_xy) and np.array_equal(data['obs_r2'], self.obs_r2)
+                    and int(data['N']) == self.N and int(data['k']) == self.k):
+                print(f"Roadmap in {file} was built for other obstacles, N or k, rebuilding it")
+                return False
+            for name in self.ARRAYS:
+                setattr(self, name, data[name])
+        return True
+
+    def _links(self, pos):
+        """Gets the collision-free edges from a position to its k nearest roadmap nodes as {row: cost}"""
+        if not len(self.pos):
+            return dict()
+        d = np.hypot(*(self.pos - pos).T)
+        rows = np.argsort(d)[:self.k]
+        free = ~self._segments_in_collision(np.tile(pos, (len(rows), 1)), self.pos[rows])
+        return dict(zip(rows[free].tolist(), d[rows[free]].tolist()))
+
+    def plan_prm(self, start, goal):
+        """Plans a path over the roadmap with A*.
+
+        The start and goal are linked to their k nearest roadmap nodes (and to
+        each other if the straight line is free) as rows N and N+1. Unchecked
+        roadmap edges on the path found are checked, and the search is run
+        again without the ones that collide.
+
+        Parameters
+        ----------
+        start, goal : float 2-tuples
+            x,y of the start and goal
+
+        Returns
+        -------
+        path : list of int
+            rows from start to goal, empty if no path exists
+        """
+
+        self.query_pos = np.array([start, goal], dtype=float)
+        start_links = self._links(self.query_pos[0])
+        goal_links = self._links(self.query_pos[1])
+        if not self._is_in_collision_line(self.query_pos[0], self.query_pos[1]):
+            start_links[self.N + 1] = self._dist(self.query_pos[0], self.query_pos[1])
+        self.links = (start_links, goal_links)
+
+        self.path = self._astar(start_links, goal_links)
+        while self.path and not self._validate_path():
+            self.path = self._astar(start_links, goal_links)
+
+        if self.path:
+            print("Path to goal found : " , [id_ + 1 for id_ in self.path])
+        else:
+            print("No path found through the roadmap. Try increasing N or k?")
+        return self.path
+
+    def _astar(self, start_links, goal_links):
+        """Runs A* from row N to row N+1 over the roadmap edges that are not known to collide"""
+
+        start_row, goal_row = self.N, self.N + 1
+        pos = self._positions()
+        offsets, indices, costs = self.offsets.tolist(), self.indices.tolist(), self.costs.tolist()
+        gx, gy = self.query_pos[1]
+        h = lambda r: sqrt((pos[r, 0] - gx)**2 + (pos[r, 1] - gy)**2)
+
+        g = {start_row: 0.0}
+        parent = {start_row: -1}
+        closed = set()
+        openSet = [(h(start_row), start_row)]
+        path = []
+        while openSet:
+            _, c = heappop(openSet)
+            if c in closed:
+                continue
+            if c == goal_row:
+                while c >= 0:
+                    path.append(c)
+                    c = parent[c]
+                path.reverse()
+                break
+            closed.add(c)
+
+            if c == start_row:
+                neighbors = start_links.items()
+            else:
+                neighbors = zip(indices[offsets[c]:offsets[c+1]], costs[offsets[c]:offsets[c+1]])
+                if c in goal_links:
+                    neighbors = list(neighbors) + [(goal_row, goal_links[c])]
+
+            for n, cost in neighbors:
+                temp_score = g[c] + cost
+                if temp_score < g.get(n, inf):
+                    g[n] = temp_score
+                    parent[n] = c
+                    heappush(openSet, (temp_score + h(n), n))
+
+        return path
+
+    def _validate_path(self):
+        """Checks the unchecked roadmap edges on self.path, giving the colliding ones an infinite cost.
+
+        Returns
+        -------
+        b : bool
+            True if every edge on the path is collision-free
+        """
+
+        # start and goal links were checked when made
+        rows = np.array(self.path[1:-1], dtype=np.int64)
+        if len(rows) < 2:
+            return True
+
+        # both directions of each path edge in the CSR arrays
+        a, b = np.concatenate((rows[:-1], rows[1:])), np.concatenate((rows[1:], rows[:-1]))
+        at = np.array([self.offsets[i] + np.flatnonzero(self.indices[self.offsets[i]:self.offsets[i+1]] == j)[0]
+                       for i, j in zip(a.tolist(), b.tolist())], dtype=np.int64)
+        n = len(rows) - 1
+        unchecked = np.flatnonzero(~self.checked[at[:n]])
+        if not len(unchecked):
+            return True
+
+        collides = self._segments_in_collision(self.pos[a[unchecked]], self.pos[b[unchecked]])
+        self.checked[at[unchecked]] = self.checked[at[unchecked + n]] = True
+        bad = unchecked[collides]
+        self.costs[at[bad]] = self.costs[at[bad + n]] = inf
+        return not len(bad)
+
+    def _positions(self):
+        """Gets the x,y of the roadmap nodes followed by the start and goal"""
+        return np.concatenate((self.pos, self.query_pos))
+
+    def _edges(self):
+        """Gets the roadmap edges not known to collide, once per direction pair, and the start and goal links"""
+        rows = np.repeat(np.arange(self.N), np.diff(self.offsets))
+        once = (rows < self.indices) & (self.costs < inf)
+        id1, id2, cost = [rows[once]], [self.indices[once]], [self.costs[once]]
+        for row, links in zip((self.N, self.N + 1), self.links):
+            id1.append(np.full(len(links), row, dtype=np.int64))
+            id2.append(np.array(list(links), dtype=np.int64))
+            cost.append(np.array(list(links.values()), dtype=float))
+        return np.concatenate(id1), np.concatenate(id2), np.concatenate(cost)
+
+    def _trace_roadmap(self):
+        """Records the roadmap edges, and the start and goal links"""
+        id1, id2, _ = self._edges()
+        pos = self._positions()
+        self.trace.edges(pos[id1], pos[id2])
@@ -1,123 +1,348 @@
+import time
+from collections import namedtuple
+from math import inf
+
 from sampling_planners import *
 
+# an improved path found by anytime planning, path is an Mx2 array of positions from start to goal
+Solution = namedtuple('Solution', ['iteration', 'time', 'cost', 'path'])
+
+def load_goals(file):
+    """Loads x,y goal positions from a csv file, skipping # comments.
+
+    Parameters
+    ----------
+    file : str
+        path to csv file with rows of the form x,y
+    """
+
+    with open(file, 'r') as goal_file:
+        return [(float(row[0]), float(row[1])) for row in csv.reader(goal_file) if row and row[0][0] != '#']
+
+
 class RRT(SamplingPlanner):
-    """Rapidly-exploring random tree (RRT) sampling-based algorithm"""
+    """Rapidly-exploring random tree (RRT) sampling-based algorithm
+
+    Planning can run to the first path from the constructor, or, with
+    plan=False, be driven by the caller through anytime(), which grows the
+    tree under a time budget and yields each better path it finds. Stopping
+    early pauses the search, and calling anytime() again resumes it on the
+    same tree.
+
+    Tree reuse: with plan=False, query() plans to one goal after another from
+    the same start. The tree and obstacle structures stay in memory. A new
+    goal is first connected straight to the cheapest nearby node it can see,
+    and the tree is only grown if none is visible. In lazy mode, a node is
+    only used once the path to it is checked.
 
-    def __init__(self, data_dir, out_dir, *args, **kwargs):
+    In lazy mode, new edges are not checked against obstacles as the tree
+    grows. Once a node reaches the goal, only the edges on its path are
+    checked, and the subtree below the first colliding edge is pruned.
+    """
+
+    def __init__(self, data_dir, out_dir, *args, max_size=500, plan=True, **kwargs):
         # calls base class constructor
         super().__init__(data_dir, out_dir, *args, **kwargs)
-        
-        # runs rrt algo
-        self.plan_rrt()
+        self.max_size = max_size
+        self.query_size = max_size
+        self._reset()
 
-        # saves planner data
-        self._save_data(out_dir)
+        if plan:
+            # runs rrt algo
+            self.plan_rrt()
+
+            # saves planner data
+            self.save(out_dir)
+
+    def _reset(self):
+        """Sets up the search state kept between anytime() calls"""
+        self.iteration = 0
+        self.elapsed = 0.0
+        self.best, self.best_cost = None, inf
+        self._final = None
+        self.history = []
+        self._valid = {0}
+        self._goal_nodes = []
+        self._pruned = []
+
+    def anytime(self, deadline=None):
+        """Grows the tree until the deadline or the node limit, yielding each better path found.
+
+        The search state is kept when the generator returns or is closed, so
+        a later call carries on where this one stopped.
+
+        Parameters
+        ----------
+        deadline : float
+            seconds of planning after which to stop, None to run to the node limit
+
+        Yields
+        ------
+        solution : Solution
+            iteration, seconds of planning so far, cost and positions of the new best path
+        """
 
-    def plan_rrt(self, max_size=500):
-        """Runs the RRT algo"""
-
-        # run loop until sample max number of nodes
-        while len(self.nodes) < max_size:
-
-            # sample a random position in space, occasionally sampling goal position
-            if random.randint(0,10) == 0:
-                if not self._is_in_collision_point(self.goal_pos):
-                    sample_pos = np.array(self.goal_pos)
-            else:
-                sample_pos = self._sample()
-
-            # get sample node position and distance from nearest node
-            nearest, d = self._neartest_node(sample_pos)
-
-            # new position after taking a step towards the sample position
-            new = self._motion(nearest, sample_pos, d)
-
-            if not self._is_in_collision_point(new):
-
-                # create new node at new
-                id_ = str(len(self.nodes)+1)
-                self.nodes[id_] = Node(
-                    id_ = id_,
-                    x_ = new[0],
-                    y_ = new[1],
-                    goal_pos_ = self.goal_pos,
-                    parent_=nearest.id)
-
-                # update neighbors
-                self.nodes[id_].neighbors[nearest.id] = self._dist(self.nodes[id_].pos, nearest.pos)
-                self.nodes[nearest.id].neighbors[id_] = self._dist(self.nodes[id_].pos, nearest.pos)
-
-                # visuzlize update
-                if self.viz: self._viz_update(nearest.pos, new, sample_pos)
-
-                # check if we are close enough to the goal position
-                if self._dist(self.nodes[id_].pos, self.goal_pos) < self.goal_tol:
-
-                    # if close enough, add node at goal position
-                    id_goal = str(len(self.nodes)+1)
-                    self.nodes[id_goal] = Node(
-                        id_=id_goal,
-                        x_=self.goal_pos[0],
-                        y_=self.goal_pos[1],
-                        goal_pos_=self.goal_pos,
-                        parent_=id_)
-
-                    # update neighbors
-                    self.nodes[id_].neighbors[id_goal] = self._dist(self.nodes[id_goal].pos, self.nodes[id_].pos)
-                    self.nodes[id_goal].neighbors[id_] = self._dist(self.nodes[id_goal].pos, self.nodes[id_].pos)
-
-                    # visualize update
-                    if self.viz: self._viz_update(self.nodes[id_].pos, 
-                                                  self.nodes[id_goal].pos, 
-                                                  self.nodes[id_goal].pos)
-                    
-                    # reconstruct path through parents
-                    self._reconstruct_path(self.nodes[id_goal])
-                    
-                    # visualize path
-                    if self.viz: self._viz_path()
-                    
-                    # done!
+        start = time.perf_counter()
+        try:
+            while not self._done():
+                if deadline is not None and time.perf_counter() - start >= deadline:
                     return
+                self.iteration += 1
+                if not self._step():
+                    continue
+
+                cost, best = self._best()
+                if cost < self.best_cost:
+                    self.best, self.best_cost = best, cost
+                    now = self.elapsed + time.perf_counter() - start
+                    self.history.append((self.iteration, now, cost))
+                    yield Solution(self.iteration, now, cost, self._path_positions(best))
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+    def plan(self, deadline=None, callback=None):
+        """Runs anytime() to the deadline or the node limit, passing each better path to callback.
+
+        Parameters
+        ----------
+        deadline : float
+            seconds of planning after which to stop, None to run to the node limit
+        callback : function
+            called with each Solution as it is found
+
+        Returns
+        -------
+        solution : Solution
+            best path found so far, None if there is none
+        """
+
+        solution = None
+        for solution in self.anytime(deadline):
+            if callback is not None: callback(solution)
+        if self.best is not None and solution is None:
+            solution = Solution(self.iteration, self.elapsed, self.best_cost, self._path_positions(self.best))
+        return solution
+
+    def save(self, out_dir):
+        """Saves the best path found so far with the tree, and the trace if one is kept"""
+        if self.best is not None: self._finalize()
+        self._finish_trace()
+        self._save_data(out_dir)
+
+    def query(self, goal, deadline=None, max_size=None, k=10):
+        """Plans a path from the start to a new goal, reusing the tree grown for earlier goals.
+
+        Parameters
+        ----------
+        goal : float 2-tuple
+            x,y of the goal
+        deadline : float
+            seconds the tree may grow for if the goal cannot be connected, None for no limit
+        max_size : int
+            nodes the tree may grow by, defaults to the max_size given at construction
+        k : int
+            number of nearest nodes tried when connecting the goal straight to the tree
+
+        Returns
+        -------
+        solution : Solution
+            path to the goal, None if none was found
+        """
+
+        if type(self)._step is not RRT._step:
+            raise ValueError("tree reuse needs the RRT growth step, it is not supported by this planner")
+
+        # forget the previous goal, keeping the tree
+        self.goal_pos = np.array(goal, dtype=float)
+        self.best, self.best_cost, self._final = None, inf, None
+        self._goal_nodes = []
+        if self._is_in_collision_point(self.goal_pos):
+            return None
+
+        # connect the goal to the visible node giving the cheapest path, in lazy mode once the path to it is checked
+        near = np.array(self._knn(k, self.goal_pos), dtype=np.int64)
+        near_pos = self.tree.pos[near]
+        d = np.hypot(*(near_pos - self.goal_pos).T)
+        free = ~self._segments_in_collision(near_pos, np.tile(self.goal_pos, (len(near), 1)))
+        solution = None
+        for parent in near[free][np.argsort((self.tree.cost[near] + d)[free], kind='stable')].tolist():
+            # skip candidates pruned while validating a cheaper one
+            if parent != 0 and self.tree.parent[parent] < 0:
+                continue
+            if self.lazy and not self._validate_path(parent):
+                continue
+            id_goal = self._add_node(self.goal_pos, parent)
+            self._valid.add(id_goal)
+            self._goal_nodes.append(id_goal)
+            if self.trace is not None: self.trace.edge(self.tree.pos[parent], self.goal_pos)
+            self.best_cost, self.best = self._best()
+            solution = Solution(self.iteration, self.elapsed, self.best_cost, self._path_positions(self.best))
+            break
+        else:
+            # grow the tree towards the new goal until it is reached
+            self.max_size = len(self.tree) + (max_size or self.query_size)
+            for solution in self.anytime(deadline):
+                break
+
+        if solution is not None:
+            self._finalize()
+        return solution
+
+    def plan_rrt(self, max_size=None):
+        """Runs the RRT algo until the first path is found or the tree holds max_size nodes (defaults to self.max_size)"""
+
+        self.max_size = max_size or self.max_size
+        for _ in self.anytime():
+            self._finalize()
+            return
 
         # print failure message
-        print(f"Max nodes of {max_size} reached. No valid path found. Try increasing max number of nodes?")
+        print(f"Max nodes of {self.max_size} reached. No valid path found. Try increasing max number of nodes?")
+
+    def _done(self):
+        """Checks if the node limit is reached"""
+        return len(self.tree) >= self.max_size
+
+    def _step(self):
+        """Runs one RRT iteration, returns True if a node was added at the goal"""
+
+        # sample a random position in space, occasionally sampling goal position
+        if self.rng.integers(0, 11) == 0 and not self._is_in_collision_point(self.goal_pos):
+            sample_pos = np.array(self.goal_pos)
+        else:
+            sample_pos = self._sample()
+
+        # get sample node position and distance from nearest node
+        nearest, d = self._neartest_node(sample_pos)
+        if d == 0:
+            return False
+
+        # new position after taking a step towards the sample position
+        new = self._motion(nearest, sample_pos, d)
+
+        if self._is_in_collision_point(new) or (not self.lazy and self._is_in_collision_line(self.tree.pos[nearest], new)):
+            return False
+
+        # create new node at new
+        id_ = self._add_node(new, nearest)
+
+        # record visualization update
+        if self.trace is not None: self._trace_update(self.tree.pos[nearest], new, sample_pos)
+
+        # check if we are close enough to the goal position
+        if self._dist(new, self.goal_pos) >= self.goal_tol:
+            return False
+
+        # the edge to the goal is checked like any other, lazily in lazy mode
+        if not self.lazy and self._is_in_collision_line(new, self.goal_pos):
+            return False
+
+        # if close enough and visible, add node at goal position
+        id_goal = self._add_node(self.goal_pos, id_)
+
+        # in lazy mode, keep growing if an edge on the path collides
+        if self.lazy and not self._validate_path(id_goal):
+            return False
+
+        # record visualization update
+        if self.trace is not None: self._trace_update(new, self.goal_pos, self.goal_pos)
+        self._goal_nodes.append(id_goal)
+        return True
+
+    def _best(self):
+        """Gets the cost and id of the cheapest node at the goal"""
+        costs = self.tree.cost[self._goal_nodes]
+        i = int(np.argmin(costs))
+        return float(costs[i]), self._goal_nodes[i]
+
+    def _path_positions(self, best):
+        """Gets the positions along the path to the best goal node"""
+        return self.tree.pos[self.tree.path(best)]
+
+    def _finalize(self):
+        """Sets self.path to the best path found and records it, once per best path"""
+        if self._final != self.best:
+            self._final = self.best
+            self._reconstruct_best()
+
+    def _reconstruct_best(self):
+        """Reconstructs the best path and records it"""
+
+        # reconstruct path through parents
+        self._reconstruct_path(self.best)
+
+        # record path
+        if self.trace is not None: self._trace_path()
+
+    def _validate_path(self, id_):
+        """Checks the unchecked edges from the root to a node, pruning the subtree below the first colliding one.
+
+        Parameters
+        ----------
+        id_ : int
+            id of the last node in the path
+
+        Returns
+        -------
+        b : bool
+            True if every edge on the path is collision-free
+        """
+
+        pos = self.tree.pos
+        path = self.tree.path(id_)
+        for parent, child in zip(path[:-1], path[1:]):
+            if child in self._valid:
+                continue
+            if self._is_in_collision_line(pos[parent], pos[child]):
+                self._prune(child)
+                return False
+            self._valid.add(child)
+        return True
+
+    def _prune(self, id_):
+        """Detaches a node and its descendants from the tree and removes them from the index"""
+
+        # children of every node in CSR form, built from the parents on demand
+        parent = self.tree.parent
+        attached = np.flatnonzero(parent >= 0)
+        children = attached[np.argsort(parent[attached], kind='stable')]
+        offsets = np.zeros(len(parent) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(parent[attached], minlength=len(parent)), out=offsets[1:])
+
+        dead, stack = [], [id_]
+        while stack:
+            c = stack.pop()
+            dead.append(c)
+            stack += children[offsets[c]:offsets[c + 1]].tolist()
+            self.index.remove(c, self.tree.pos[c])
+
+        parent[dead] = -1
+        self._pruned += dead
+        dead = set(dead)
+        self._goal_nodes = [id_ for id_ in self._goal_nodes if id_ not in dead]
+
+    def _node_ids(self):
+        """Gets the ids of the nodes still in the tree, leaving out pruned ones"""
+        return np.delete(super()._node_ids(), self._pruned)
 
     def _neartest_node(self, pos):
-        """search through nodes to find closest neighbor"""
-        nn = self.nodes[self._knn(1, pos)[0]]
-        return nn, self._dist(nn.pos, pos)
+        """search through nodes to find closest neighbor, returns its id and distance"""
+        nn = self.index.nearest(pos)
+        return nn, self._dist(self.tree.pos[nn], pos)
 
     def _motion(self, nearest, sample_pos, d):
         """get position of nearest node plus a step towards the sample pos"""
-        return nearest.pos + self.step * np.array(sample_pos-nearest.pos)/d
+        return self.tree.pos[nearest] + self.step * np.array(sample_pos-self.tree.pos[nearest])/d
 
     def _reconstruct_path(self, current):
         """Build path by looping through parents until reaching start node.
 
         Parameters
         ----------
-        current : Node object
-            node to build the path from
+        current : int
+            id of the node to build the path from
         """
 
-        # add current node to path
-        self.path = [current.id]
-
-        # loop until no parents exist
-        while current.parent is not None:
-
-            # add node parent to beginning of path
-            self.path.insert(0, self.nodes[current.id].parent)
-
-            # new current node as current node's parent
-            current = self.nodes[current.parent]
-
-        print("Path to goal found : " , self.path)
+        self.path = self.tree.path(current)
 
-    def _viz_update(self, old, new, samp):
-        """visualize update"""
-        sc = self.ax.scatter(samp[0], samp[1], color=[0.5,0.0,0.5], s=100)
-        self.ax.plot([old[0], new[0]], [old[1], new[1]], 'ko-', markersize=1, zorder=1)
-        plt.pause(0.001)
-        sc.remove()
+        print("Path to goal found : " , [id_ + 1 for id_ in self.path])
@@ -0,0 +1,138 @@
+from rrt import *
+
+# results of extending a tree towards a position
+TRAPPED, ADVANCED, REACHED = 0, 1, 2
+
+class RRTConnect(RRT):
+    """Bidirectional RRT-Connect sampling-based algorithm
+
+    Trees are grown from the start (self.tree) and from the goal. Each
+    iteration extends one tree a step towards a sample, then greedily extends
+    the other tree towards the new node until it is reached or blocked. The
+    trees swap roles every iteration. Output files list the start tree's
+    nodes first, then the goal tree's. anytime() yields a single path, once
+    the trees meet.
+    """
+
+    def _reset(self):
+        """Sets up the search state kept between anytime() calls, including the goal tree"""
+        super()._reset()
+
+        # goal tree, with its own spatial index
+        self.goal_tree = Tree(self.goal_pos)
+        self.goal_index = GridIndex(self.C, cell=self.step)
+        self.goal_index.insert(0, self.goal_pos)
+        self.links = None
+        self._trees = (self.tree, self.index), (self.goal_tree, self.goal_index)
+
+    def plan_rrt(self, max_size=None):
+        """Runs the RRT-Connect algo until the trees meet or together hold max_size nodes (defaults to self.max_size)"""
+
+        self.max_size = max_size or self.max_size
+        for solution in self.anytime():
+            self.solve_time = solution.time
+            self._finalize()
+            return
+
+        # print failure message
+        print(f"Max nodes of {self.max_size} reached. No valid path found. Try increasing max number of nodes?")
+
+    def _done(self):
+        """Checks if the trees have met or together hold max_size nodes"""
+        return self.best is not None or len(self.tree) + len(self.goal_tree) >= self.max_size
+
+    def _step(self):
+        """Runs one RRT-Connect iteration, returns True if the trees met"""
+
+        a, b = self._trees
+        self._trees = b, a
+        sample_pos = self._sample()
+
+        status, new = self._extend(*a, sample_pos)
+        if status == TRAPPED:
+            return False
+
+        # greedily extend the other tree towards the new node
+        target = a[0].pos[new]
+        status, other = self._extend(*b, target)
+        while status == ADVANCED:
+            status, other = self._extend(*b, target)
+
+        if status == REACHED:
+            self._meet = (new, other) if a[0] is self.tree else (other, new)
+            return True
+        return False
+
+    def _best(self):
+        """Gets the cost of the path through the meeting nodes, and their ids in the start and goal trees"""
+        start_id, goal_id = self._meet
+        return float(self.tree.cost[start_id] + self.goal_tree.cost[goal_id]), self._meet
+
+    def _path_positions(self, best):
+        """Gets the positions along the path through the meeting nodes"""
+        start_id, goal_id = best
+        return np.concatenate((self.tree.pos[self.tree.path(start_id)], self.goal_tree.pos[self.goal_tree.path(goal_id)[-2::-1]]))
+
+    def _reconstruct_best(self):
+        """Reconstructs the path through the meeting nodes and records it"""
+        self._reconstruct_path(*self.best)
+        if self.trace is not None: self._trace_path()
+
+    def _extend(self, tree, index, pos):
+        """Steps a tree from its nearest node towards a position.
+
+        Returns
+        -------
+        status : int
+            REACHED if the new node is at pos, ADVANCED if it is a step towards it,
+            TRAPPED if the step collides and no node was added
+        id_ : int
+            id of the new node in tree, None if trapped
+        """
+
+        nearest = index.nearest(pos)
+        d = self._dist(tree.pos[nearest], pos)
+        if d == 0:
+            return REACHED, nearest
+
+        new = tree.pos[nearest] + self.step * (pos - tree.pos[nearest]) / d if d > self.step else np.array(pos)
+        if self._is_in_collision_point(new) or self._is_in_collision_line(tree.pos[nearest], new):
+            return TRAPPED, None
+
+        id_ = tree.add(new, nearest)
+        index.insert(id_, new)
+        if self.trace is not None: self._trace_update(tree.pos[nearest], new, pos)
+        return (REACHED if d <= self.step else ADVANCED), id_
+
+    def _reconstruct_path(self, start_id, goal_id):
+        """Build path from the start through the meeting nodes of both trees to the goal.
+
+        Parameters
+        ----------
+        start_id, goal_id : int
+            ids of the meeting nodes in the start and goal trees, at the same position
+        """
+
+        # goal tree ids follow the start tree's in the output, the goal tree's meeting node duplicates the start tree's
+        offset = len(self.tree)
+        self.links = (start_id, goal_id + offset)
+        self.path = self.tree.path(start_id) + [id_ + offset for id_ in reversed(self.goal_tree.path(goal_id))]
+
+        print("Path to goal found : " , [id_ + 1 for id_ in self.path])
+
+    def _positions(self):
+        """Gets the x,y of the start tree's nodes followed by the goal tree's"""
+        return np.concatenate((self.tree.pos, self.goal_tree.pos))
+
+    def _edges(self):
+        """Gets the edges of both trees, and a zero cost link between the meeting nodes"""
+        offset = len(self.tree)
+        edges = [self.tree.edges(), self.goal_tree.edges()]
+        id1 = [edges[0][0], edges[1][0] + offset]
+        id2 = [edges[0][1], edges[1][1] + offset]
+        cost = [edges[0][2], edges[1][2]]
+        if self.links is not None:
+            id1.append(np.array([self.links[0]]))
+            id2.append(np.array([self.links[1]]))
+            cost.append(np.zeros(1))
+        return np.concatenate(id1), np.concatenate(id2), np.concatenate(cost)
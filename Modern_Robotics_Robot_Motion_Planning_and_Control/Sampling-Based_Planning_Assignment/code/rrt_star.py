@@ -0,0 +1,179 @@
+from math import log, pi, atan2, cos, sin, sqrt, inf
+
+from rrt import *
+
+class RRTStar(RRT):
+    """Asymptotically optimal RRT (RRT*) with an optional informed sampling mode
+
+    Each new node picks the parent that gives it the cheapest path among the
+    nodes within a shrinking radius, then the nodes in that radius are
+    rewired through it if that makes them cheaper. Neighbors come from the
+    spatial index's radius query, so an iteration only touches nearby nodes.
+    Planning keeps going after the first path is found. In informed mode,
+    samples are then drawn from the ellipse of positions that could still
+    improve the best path.
+    """
+
+    def __init__(self, data_dir, out_dir, iterations=2000, informed=False, eta=None, *args, **kwargs):
+        """
+        Parameters
+        ----------
+        data_dir, out_dir : str
+            paths to the obstacle data and output directories (ending in /)
+        iterations : int
+            number of samples to draw
+        informed : bool
+            sample from the ellipse that can improve the best path once one is found
+        eta : float
+            largest rewiring radius, defaults to three steps
+        """
+
+        self.iterations = iterations
+        self.informed = informed
+        self.eta = eta
+
+        # calls RRT constructor, which runs plan_rrt and saves planner data
+        super().__init__(data_dir, out_dir, *args, **kwargs)
+
+    def _radius(self):
+        """Rewiring radius, shrinking as gamma*sqrt(log(n)/n) for asymptotic optimality in 2D"""
+        n = len(self.tree)
+        area = (self.C[0, 1] - self.C[0, 0]) * (self.C[1, 1] - self.C[1, 0])
+        gamma = 2 * sqrt(1.5 * area / pi)
+        return min(gamma * sqrt(log(n) / n), self.eta) if n > 1 else self.eta
+
+    def _sample_informed(self, c_best):
+        """Samples a collision-free position inside C from the ellipse of paths shorter than c_best.
+
+        The ellipse has the start and goal as foci, so every position x in it
+        has |x - start| + |goal - x| <= c_best.
+        """
+
+        if self._ellipse != c_best:
+            self._ellipse, self._informed_buffer = c_best, []
+
+        while not self._informed_buffer:
+            c_min = self._dist(self.start_pos, self.goal_pos)
+            r1, r2 = c_best / 2, sqrt(max(c_best**2 - c_min**2, 0.0)) / 2
+            theta = atan2(self.goal_pos[1] - self.start_pos[1], self.goal_pos[0] - self.start_pos[0])
+            center = (np.asarray(self.start_pos) + np.asarray(self.goal_pos)) / 2
+
+            # uniform points in the unit disk, stretched and rotated onto the ellipse
+            n = self.sampler.block
+            radius, angle = np.sqrt(self.rng.random(n)), 2 * pi * self.rng.random(n)
+            x, y = r1 * radius * np.cos(angle), r2 * radius * np.sin(angle)
+            points = center + np.stack((cos(theta)*x - sin(theta)*y, sin(theta)*x + cos(theta)*y), axis=1)
+
+            inside = ((points >= self.C[:, 0]) & (points <= self.C[:, 1])).all(axis=1)
+            points = points[inside]
+            self._informed_buffer = list(points[~self._points_in_collision(points)])
+        return self._informed_buffer.pop()
+
+    def _set_parent(self, id_, parent, cost):
+        """Moves a node under a new parent and shifts the costs of its whole subtree"""
+        old = int(self.tree.parent[id_])
+        self._children[old].remove(id_)
+        self._children[parent].append(id_)
+        self.tree.parent[id_] = parent
+
+        delta = cost - self.tree.cost[id_]
+        stack = [id_]
+        costs = self.tree.cost
+        while stack:
+            c = stack.pop()
+            costs[c] += delta
+            stack += self._children[c]
+
+    def _reset(self):
+        """Sets up the search state kept between anytime() calls"""
+        super()._reset()
+        self.eta = self.eta or 3 * self.step
+        self._children = [[]]
+        self._ellipse, self._informed_buffer = None, []
+
+    def plan_rrt(self):
+        """Runs the RRT* algo for the set number of iterations.
+
+        Records (iteration, seconds, best cost) in self.history whenever the
+        best path improves.
+        """
+
+        for _ in self.anytime():
+            pass
+
+        if self.best is None:
+            print(f"No valid path found in {self.iterations} iterations. Try increasing the number of iterations?")
+            return
+
+        self._finalize()
+        print(f"Path cost : {self.tree.cost[self.path[-1]]:.4f}")
+
+    def _done(self):
+        """Checks if the set number of iterations has run"""
+        return self.iteration >= self.iterations
+
+    def _step(self):
+        """Runs one RRT* iteration, returns True if a node near the goal was added"""
+
+        # sample, from the informed ellipse once a path exists, occasionally sampling goal position
+        if self.informed and self.best_cost < inf:
+            sample_pos = self._sample_informed(self.best_cost)
+        elif self.rng.integers(0, 11) == 0 and not self._is_in_collision_point(self.goal_pos):
+            sample_pos = np.array(self.goal_pos)
+        else:
+            sample_pos = self._sample()
+
+        # steer from the nearest node towards the sample
+        nearest, d = self._neartest_node(sample_pos)
+        if d == 0:
+            return False
+        new = self._motion(nearest, sample_pos, d) if d > self.step else sample_pos
+        if self._is_in_collision_point(new):
+            return False
+
+        # choose the parent giving the cheapest collision-free path to new
+        near = np.array(self._near(new, max(self._radius(), self._dist(self.tree.pos[nearest], new))), dtype=np.int64)
+        near_pos = self.tree.pos[near]
+        d_near = np.hypot(*(near_pos - new).T)
+        free = ~self._segments_in_collision(near_pos, np.tile(new, (len(near), 1)))
+        if not free.any():
+            return False
+        through = np.where(free, self.tree.cost[near] + d_near, inf)
+        parent = int(near[np.argmin(through)])
+        id_ = self._add_node(new, parent)
+        self._children.append([])
+        self._children[parent].append(id_)
+        new_cost = self.tree.cost[id_]
+
+        # rewire the neighbors that get cheaper through new
+        cheaper = free & (new_cost + d_near < self.tree.cost[near])
+        for n, d_n in zip(near[cheaper].tolist(), d_near[cheaper].tolist()):
+            self._set_parent(n, id_, new_cost + d_n)
+
+        # record visualization update
+        if self.trace is not None: self._trace_update(self.tree.pos[parent], new, sample_pos)
+
+        # track the nodes within tolerance of the goal that can see it, rewiring can make any of them the cheapest
+        if self._dist(new, self.goal_pos) < self.goal_tol and not self._is_in_collision_line(new, self.goal_pos):
+            self._goal_nodes.append(id_)
+        return bool(self._goal_nodes)
+
+    def _best(self):
+        """Gets the cost of the cheapest path through a node near the goal, and that node's id"""
+        goal_cost = self.tree.cost[self._goal_nodes] + np.hypot(*(self.tree.pos[self._goal_nodes] - self.goal_pos).T)
+        i = int(np.argmin(goal_cost))
+        return float(goal_cost[i]), self._goal_nodes[i]
+
+    def _path_positions(self, best):
+        """Gets the positions along the path through the best node near the goal, ending at the goal"""
+        return np.concatenate((self.tree.pos[self.tree.path(best)], np.reshape(self.goal_pos, (1, 2))))
+
+    def _reconstruct_best(self):
+        """Adds a node at the goal under the best node near it, then reconstructs and records the path"""
+        id_goal = self._add_node(self.goal_pos, self.best)
+        self._children.append([])
+        self._children[self.best].append(id_goal)
+        self._reconstruct_path(id_goal)
+
+        # record path
+        if self.trace is not None: self._trace_path()
@@ -0,0 +1,144 @@
+import numpy as np
+
+
+def uniform(rng, start, n):
+    """Independent uniform points in the unit square"""
+    return rng.random((n, 2))
+
+
+def halton(rng, start, n):
+    """Points start+1 .. start+n of the 2D Halton sequence (bases 2 and 3)"""
+    points = np.zeros((n, 2))
+    for d, base in enumerate((2, 3)):
+        i = np.arange(start + 1, start + n + 1)
+        f = 1.0
+        while i.any():
+            f /= base
+            points[:, d] += f * (i % base)
+            i //= base
+    return points
+
+
+_SOBOL_BITS = 32
+
+
+def _sobol_directions():
+    """Direction numbers of the 2D Sobol sequence, the second dimension uses the polynomial x + 1"""
+    v = np.zeros((2, _SOBOL_BITS), dtype=np.uint64)
+    m = 1
+    for k in range(_SOBOL_BITS):
+        v[0, k] = 1 << (_SOBOL_BITS - 1 - k)
+        v[1, k] = m << (_SOBOL_BITS - 1 - k)
+        m = (m << 1) ^ m
+    return v
+
+
+_SOBOL_V = _sobol_directions()
+
+
+def sobol(rng, start, n):
+    """Points start+1 .. start+n of the 2D Sobol sequence"""
+    i = np.arange(start + 1, start + n + 1, dtype=np.uint64)
+    x = np.zeros((n, 2), dtype=np.uint64)
+    for k in range(int(start + n).bit_length()):
+        bit = ((i >> np.uint64(k)) & np.uint64(1)).astype(bool)
+        x[bit] ^= _SOBOL_V[:, k]
+    return x / float(1 << _SOBOL_BITS)
+
+
+# sequences that can be picked by name
+SEQUENCES = {'uniform': uniform, 'halton': halton, 'sobol': sobol}
+
+
+class Sampler():
+    """Buffered, seeded sampler of collision-free positions in a box.
+
+    Candidates are drawn a block at a time from a sequence of points in the
+    unit square, scaled into the bounds and filtered by one vectorized
+    collision check. Every random draw goes through a single
+    numpy.random.Generator, so a seed makes a planner run reproducible.
+    Low-discrepancy sequences are randomized with one random shift (modulo 1)
+    per sampler, so they still depend on the seed.
+
+    ...
+
+    Attributes
+    ----------
+    rng : numpy.random.Generator
+        generator for every random draw, including the planner's own
+    drawn : int
+        number of sequence points drawn so far
+
+    Methods
+    -------
+    sample()
+        gets the next collision-free position
+    draw()
+        draws the next block of candidates and gets the collision-free ones
+    """
+
+    def __init__(self, bounds, is_free=None, seed=None, sequence='uniform', block=256, start=0, shift=None):
+        """
+        Parameters
+        ----------
+        bounds : float 2x2 array
+            [[x_min, x_max], [y_min, y_max]] box to sample in
+        is_free : function
+            maps an Mx2 array of positions to a bool M array, True where a position is valid
+        seed : int
+            seed of the generator, None for a fresh one each run
+        sequence : str or function
+            'uniform', 'halton', 'sobol', or a function (rng, start, n) returning
+            points start+1 .. start+n of a sequence in the unit square as an nx2 array
+        block : int
+            number of candidates drawn at a time
+        start : int
+            number of sequence points to skip, so samplers can draw disjoint ranges of one sequence
+        shift : float 2 array
+            random shift of the sequence, drawn from the generator if None, shared by such samplers
+        """
+
+        self.lo = np.asarray(bounds, dtype=float)[:, 0]
+        self.size = np.asarray(bounds, dtype=float)[:, 1] - self.lo
+        self.is_free = is_free
+        self.rng = np.random.default_rng(seed)
+        self.sequence = SEQUENCES[sequence] if isinstance(sequence, str) else sequence
+        self.shift = self.rng.random(2) if shift is None else np.asarray(shift, dtype=float)
+        self.block = block
+        self.drawn = start
+        self._buffer = np.zeros((0, 2))
+        self._next = 0
+
+    def draw(self):
+        """Draws the next block of candidates.
+
+        Returns
+        -------
+        points : float Mx2 array
+            the collision-free candidates, in sequence order
+        """
+
+        unit = (self.sequence(self.rng, self.drawn, self.block) + self.shift) % 1.0
+        self.drawn += self.block
+        points = self.lo + unit * self.size
+        if self.is_free is not None:
+            points = points[self.is_free(points)]
+        return points
+
+    def _refill(self):
+        """Draws a block of candidates and keeps the collision-free ones"""
+        self._buffer, self._next = self.draw(), 0
+
+    def sample(self):
+        """Gets the next collision-free position.
+
+        Returns
+        -------
+        pos : float 2 array
+            x,y of the position
+        """
+
+        while self._next == len(self._buffer):
+            self._refill()
+        self._next += 1
+        return self._buffer[self._next - 1]
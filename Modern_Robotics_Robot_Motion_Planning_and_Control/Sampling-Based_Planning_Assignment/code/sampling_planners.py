@@ -1,16 +1,20 @@
 import numpy as np
-import matplotlib.pyplot as plt
 import csv
-import random
-from math import sqrt, inf
+from math import sqrt
 
 from obstacle import Obstacle
-from node import Node
+from tree import Tree
+from spatial_index import GridIndex
+from obstacle_grid import ObstacleGrid
+from sampler import Sampler
+from output import save_results
+from plan_trace import Trace, Renderer
 
 class SamplingPlanner():
     """Base class for RRT and PRM sample-based planners"""
     
-    def __init__(self, data_dir, out_dir, start_=np.array([-0.5, -0.5]), goal_=np.array([0.5, 0.5]), step_=0.05, goal_tol=0.05, viz_=False):
+    def __init__(self, data_dir, out_dir, start_=np.array([-0.5, -0.5]), goal_=np.array([0.5, 0.5]), step_=0.05, goal_tol=0.05, viz_=False,
+                 seed_=None, sampler_='uniform', binary_=False, trace_=None, lazy_=False):
         
         # bounds on C-space
         self.C = np.array([[-0.5, 0.5], [-0.5, 0.5]])
@@ -20,11 +24,12 @@ class SamplingPlanner():
         self.goal_pos = goal_
         self.goal_tol = goal_tol
 
-        # dictionary for nodes
-        self.nodes = dict()
+        # tree of node positions, parents and costs, rooted at the start
+        self.tree = Tree(start_)
 
-        # add first (starting) node to list
-        self.nodes[str(1)] = Node(str(1), start_[0], start_[1], self.goal_pos)
+        # spatial index over node positions for neighbor queries
+        self.index = GridIndex(self.C, cell=step_)
+        self.index.insert(0, start_)
         
         # list for obstacles
         self.obs = []
@@ -35,13 +40,25 @@ class SamplingPlanner():
         # load obstacle data
         self._load_data(data_dir)
 
+        # collision-free samples from one seeded generator, also used for goal biasing
+        self.sampler = Sampler(self.C, lambda points: ~self._points_in_collision(points), seed_, sampler_)
+        self.rng = self.sampler.rng
+
         # list for path
         self.path = []
 
-        # visualize?
+        # defer edge checks until an edge is on a candidate path? segment checks are counted either way
+        self.lazy = lazy_
+        self.segment_checks = 0
+
+        # save results.npz instead of csv files?
+        self.binary = binary_
+
+        # record a trace of planning events if visualizing or saving one, drawn live at a throttled rate
         self.viz = viz_
-        if self.viz:
-            self._init_viz()
+        self.trace_file = trace_
+        self.trace = Trace(self.C, self.obs_xy, np.sqrt(self.obs_r2), start_, goal_) if viz_ or trace_ else None
+        self.renderer = Renderer(self.trace) if viz_ else None
 
     def _load_data(self, dir_):
         """Loads data from obstacles.csv and stores in obstacles list
@@ -56,44 +73,22 @@ class SamplingPlanner():
                 if row[0][0] != '#':
                     self.obs.append(Obstacle(float(row[0]), float(row[1]), float(row[2])/2.0))
 
+        # obstacle centers and squared radii as arrays for vectorized collision checks
+        self.obs_xy = np.array([[o.x, o.y] for o in self.obs], dtype=float).reshape(-1, 2)
+        self.obs_r2 = np.array([o.r**2 for o in self.obs], dtype=float)
+
+        # broad phase so checks only test obstacles near the query
+        self.obs_grid = ObstacleGrid(self.obs_xy, np.sqrt(self.obs_r2))
+
     def _save_data(self, out_dir):
-        """saves path, node, and edge data"""
-
-        # save path data in csv [node_0, node_1, ...]
-        def _save_path():
-            with open(out_dir + "path.csv", 'w') as path_file:
-                writer = csv.writer(path_file)
-                writer.writerow(self.path)
-
-        # save node data in csv [ID,x,y]
-        def _save_nodes():
-            with open(out_dir + "nodes.csv", 'w') as node_file:
-                writer = csv.writer(node_file)
-                writer.writerow(['# ID','x','y'])
-                for n in self.nodes.values():
-                    writer.writerow([n.id, n.x, n.y])
-
-        # save edge data in csv [ID1,ID2,cost]
-        def _save_edges():
-            with open(out_dir + "edges.csv", 'w') as edge_file:
-                writer = csv.writer(edge_file)
-                writer.writerow(['# ID1','ID2','cost'])
-                saved_edges = [[]]
-                for node in self.nodes.values():
-                    for neighbor in node.neighbors:
-                        node_id = int(node.id)
-                        neighbor_id = int(neighbor)
-                        if [neighbor_id,node_id] in saved_edges:
-                            continue
-                        else:
-                            writer.writerow([node_id, neighbor_id, node.neighbors[neighbor]])
-                            saved_edges.append([node_id, neighbor_id])
-                            continue
-
-        # run save subfunctions
-        _save_path()
-        _save_nodes()
-        _save_edges()
+        """saves path, node, and edge data as csv files, or as results.npz if binary"""
+
+        # ids are numbered from 1 in the output
+        ids = self._node_ids()
+        pos = self._positions()[ids]
+        id1, id2, cost = self._edges()
+        save_results(out_dir, [id_ + 1 for id_ in self.path], (ids + 1, pos[:, 0], pos[:, 1]),
+                     (id1 + 1, id2 + 1, cost), self.binary)
 
     def _is_in_collision_point(self, pos):
         """Checks point collision for every obstacle
@@ -108,18 +103,7 @@ class SamplingPlanner():
             True if in collision
             False if not in collision
         """
-
-        # loop through each obstacle
-        for o in self.obs: 
-
-            # check if pos collides with obstacle
-            if o.is_in_collision_point(pos):
-
-                # returns True if in collision
-                return True
-
-        # return False if not in collision
-        return False
+        return self.obs_grid.point(pos)
 
     def _is_in_collision_line(self, a, b):
         """Checks line collision between two points for every obstacle
@@ -135,18 +119,39 @@ class SamplingPlanner():
             True if line between two points would be invalid,
             False if line between two points would be valid
         """
+        self.segment_checks += 1
+        return self.obs_grid.segment(a, b)
 
-        # loop through each obstacle
-        for o in self.obs:
+    def _points_in_collision(self, points):
+        """Checks many points against every obstacle at once
+
+        Parameters
+        ----------
+        points : float Mx2 array
+            x,y positions to check
+
+        Returns
+        -------
+        b : bool M array
+            True where a point is inside an obstacle
+        """
+        return self.obs_grid.points(points)
 
-            # check if pos collides with obstacle
-            if o.is_in_collision_line(a, b):
+    def _segments_in_collision(self, a, b):
+        """Checks many segments against every obstacle at once
 
-                # returns True if in collision
-                return True
+        Parameters
+        ----------
+        a, b : float Mx2 arrays
+            end points of the segments to check
 
-        # return False if not in collision
-        return False
+        Returns
+        -------
+        b : bool M array
+            True where a segment passes through an obstacle
+        """
+        self.segment_checks += len(a)
+        return self.obs_grid.segments(a, b)
 
     def _sample(self):
         """Samples from C until a valid node (not in collision with any obstacles) is created
@@ -156,17 +161,7 @@ class SamplingPlanner():
         x,y : float 2-tuple
             valid node position
         """
-        # run until valid point is found
-        while True:
-
-            # get random x,y in C-space
-            x, y = np.random.uniform(-0.5, 0.5), np.random.uniform(-0.5, 0.5)
-
-            # check for collision with any obstacles
-            if not self._is_in_collision_point([x,y]):
-
-                # point is valid, return position
-                return np.array([x,y])
+        return self.sampler.sample()
 
     def _dist(self, point_1, point_2):
         """Get euclidian distance between two points
@@ -185,28 +180,47 @@ class SamplingPlanner():
         """
         return sqrt((point_1[0] - point_2[0])**2 + (point_1[1] - point_2[1])**2)
 
-    def _init_viz(self):
-        self.fig = plt.figure()
-        self.ax = self.fig.gca()
-        plt.axis([-0.5, 0.5, -0.5, 0.5])
-
-        # obstacles
-        for o in self.obs:
-            self.ax.add_patch(plt.Circle((o.x, o.y), o.r, color=[0.5, 0.5, 0.5]))
-
-        # start and goal
-        self.ax.scatter(self.start_pos[0], self.start_pos[1], c='g', marker='o')
-        self.ax.scatter(self.goal_pos[0], self.goal_pos[1], c='b', marker='o')
-
-        # plt.show()
-        plt.pause(0.1)
-
-    def _viz_path(self):
-        """Visualizes path"""
-        for p in self.path:
-            self.ax.scatter(self.nodes[p].x, self.nodes[p].y, c='r', marker='o', s=200, zorder=2)
-            plt.pause(0.0001)
+    def _trace_update(self, old, new, samp):
+        """Records a sample and the edge it added, drawing it if it is time to"""
+        self.trace.sample(samp)
+        self.trace.edge(old, new)
+        if self.renderer is not None: self.renderer.poll()
+
+    def _trace_path(self):
+        """Records the path"""
+        self.trace.path(self._positions()[self.path].reshape(-1, 2))
+
+    def _finish_trace(self):
+        """Draws whatever has not been drawn and saves the trace, if one is kept"""
+        if self.trace is None:
+            return
+        if self.renderer is not None:
+            self.renderer.draw()
+        if self.trace_file:
+            self.trace.save(self.trace_file)
+
+    def _positions(self):
+        """Gets the x,y of every node as an Nx2 array, row i is node id i"""
+        return self.tree.pos
+
+    def _node_ids(self):
+        """Gets the ids of the nodes to save, every row of _positions()"""
+        return np.arange(len(self._positions()))
+
+    def _edges(self):
+        """Gets every edge as (id1, id2, cost) arrays, one edge per non-root tree node"""
+        return self.tree.edges()
+
+    def _add_node(self, pos, parent):
+        """Adds a node to the tree and the spatial index, returning its id"""
+        id_ = self.tree.add(pos, parent)
+        self.index.insert(id_, pos)
+        return id_
 
     def _knn(self, k, pos):
-        """Gets k closest neighbors to a position"""
-        return sorted(self.nodes, key=lambda x: sqrt((self.nodes[x].x - pos[0])**2 + (self.nodes[x].y - pos[1])**2))[:k]
\ No newline at end of file
+        """Gets ids of the k closest nodes to a position, closest first"""
+        return self.index.knn(k, pos)
+
+    def _near(self, pos, r):
+        """Gets ids of all nodes within distance r of a position"""
+        return self.index.radius(pos, r)
\ No newline at end of file
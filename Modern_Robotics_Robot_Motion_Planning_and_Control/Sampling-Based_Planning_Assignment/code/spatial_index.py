@@ -0,0 +1,224 @@
+from array import array
+from math import floor, inf
+from heapq import nsmallest
+
+
+class GridIndex():
+    """Incrementally updatable uniform grid hash for 2D nearest neighbor queries.
+
+    Points are bucketed into square cells. Queries scan rings of cells around
+    the query point and stop once no unscanned cell can hold a closer point.
+    The grid is refined (and rehashed) whenever the average number of points
+    per cell over the bounds grows past a threshold, so queries stay roughly
+    constant time as the number of points grows. Coordinates and cell contents
+    are kept in typed arrays, about 32 bytes per point.
+
+    ...
+
+    Attributes
+    ----------
+    cell : float
+        side length of a cell
+
+    Methods
+    -------
+    insert(key, pos)
+        adds a point
+    remove(key, pos)
+        removes a point
+    nearest(pos)
+        gets the key of the closest point
+    knn(k, pos)
+        gets the keys of the k closest points, closest first
+    radius(pos, r)
+        gets the keys of all points within distance r
+    """
+
+    def __init__(self, bounds, cell=None, max_per_cell=4):
+        """
+        Parameters
+        ----------
+        bounds : float 2x2 array
+            [[x_min, x_max], [y_min, y_max]] region the points are expected in
+        cell : float
+            initial cell side length, defaults to a tenth of the larger side
+        max_per_cell : int
+            average points per cell over the bounds before the grid is refined
+        """
+
+        self.bounds = bounds
+        self.area = (bounds[0][1] - bounds[0][0]) * (bounds[1][1] - bounds[1][0])
+        self.cell = cell or max(bounds[0][1] - bounds[0][0], bounds[1][1] - bounds[1][0]) / 10
+        self.max_per_cell = max_per_cell
+        self.xs, self.ys = array('d'), array('d')
+        self.keys = []
+        self._removed = set()
+        self._rehash()
+
+    def __len__(self):
+        return len(self.keys) - len(self._removed)
+
+    def _rehash(self):
+        """Rebuilds the cells from all points at the current cell size"""
+        self.cells = dict()
+        self.lo = [inf, inf]
+        self.hi = [-inf, -inf]
+        for p in range(len(self.keys)):
+            if p not in self._removed:
+                self._bucket(p)
+
+    def _cell_of(self, x, y):
+        """Gets the (i, j) cell of a position, cells are stored under the key (i << 32) + j"""
+        return floor(x / self.cell), floor(y / self.cell)
+
+    def _bucket(self, p):
+        """Adds point index p to its cell and grows the occupied cell range"""
+        i, j = self._cell_of(self.xs[p], self.ys[p])
+        cell = self.cells.get((i << 32) + j)
+        if cell is None:
+            cell = self.cells[(i << 32) + j] = array('q')
+        cell.append(p)
+        self.lo = [min(self.lo[0], i), min(self.lo[1], j)]
+        self.hi = [max(self.hi[0], i), max(self.hi[1], j)]
+
+    def insert(self, key, pos):
+        """Adds a point.
+
+        Parameters
+        ----------
+        key : hashable
+            key returned by queries for this point
+        pos : float 2-tuple
+            x,y position of the point
+        """
+
+        self.xs.append(float(pos[0]))
+        self.ys.append(float(pos[1]))
+        self.keys.append(key)
+        self._bucket(len(self.keys) - 1)
+
+        # refine the grid once cells get crowded, amortized O(1) per insert
+        if len(self) > self.max_per_cell * self.area / self.cell**2:
+            self.cell /= 2
+            self._rehash()
+
+    def remove(self, key, pos):
+        """Removes a point from its cell, in time proportional to the points in that cell.
+
+        The point's coordinates stay in the arrays, so the positions of other
+        points are unchanged, but it is no longer found by queries.
+
+        Parameters
+        ----------
+        key : hashable
+            key of the point to remove
+        pos : float 2-tuple
+            x,y position the point was inserted at
+        """
+
+        i, j = self._cell_of(float(pos[0]), float(pos[1]))
+        cell = self.cells.get((i << 32) + j, ())
+        for at, p in enumerate(cell):
+            if self.keys[p] == key:
+                del cell[at]
+                self._removed.add(p)
+                return
+        raise KeyError(key)
+
+    def _ring(self, ci, cj, r):
+        """Yields the occupied cells at Chebyshev distance r from cell (ci, cj)"""
+        cells = self.cells
+        if r == 0:
+            if (ci << 32) + cj in cells: yield cells[(ci << 32) + cj]
+            return
+        for i in range(ci - r, ci + r + 1):
+            for j in (cj - r, cj + r):
+                if (i << 32) + j in cells: yield cells[(i << 32) + j]
+        for j in range(cj - r + 1, cj + r):
+            for i in (ci - r, ci + r):
+                if (i << 32) + j in cells: yield cells[(i << 32) + j]
+
+    def _max_ring(self, ci, cj):
+        """Ring beyond which there are no occupied cells"""
+        return max(ci - self.lo[0], self.hi[0] - ci, cj - self.lo[1], self.hi[1] - cj)
+
+    def knn(self, k, pos):
+        """Gets the keys of the k closest points, closest first.
+
+        Parameters
+        ----------
+        k : int
+            number of neighbors
+        pos : float 2-tuple
+            x,y position to search around
+        """
+
+        x, y = float(pos[0]), float(pos[1])
+        xs, ys = self.xs, self.ys
+        ci, cj = self._cell_of(x, y)
+        found = []
+        r, r_max = 0, self._max_ring(ci, cj)
+        while r <= r_max:
+            for bucket in self._ring(ci, cj, r):
+                found += [((xs[p] - x)**2 + (ys[p] - y)**2, p) for p in bucket]
+
+            # every point in ring r+1 is at least r cells away
+            if len(found) >= k:
+                best = nsmallest(k, found)
+                if best[-1][0] <= (r * self.cell)**2:
+                    return [self.keys[p] for _, p in best]
+            r += 1
+        return [self.keys[p] for _, p in nsmallest(k, found)]
+
+    def nearest(self, pos):
+        """Gets the key of the closest point, None if there are no points.
+
+        Parameters
+        ----------
+        pos : float 2-tuple
+            x,y position to search around
+        """
+
+        x, y = float(pos[0]), float(pos[1])
+        xs, ys = self.xs, self.ys
+        ci, cj = self._cell_of(x, y)
+        best, best_p = inf, None
+        r, r_max = 0, self._max_ring(ci, cj)
+        while r <= r_max:
+            for bucket in self._ring(ci, cj, r):
+                for p in bucket:
+                    d = (xs[p] - x)**2 + (ys[p] - y)**2
+                    if d < best:
+                        best, best_p = d, p
+
+            # every point in ring r+1 is at least r cells away
+            if best <= (r * self.cell)**2:
+                break
+            r += 1
+        return None if best_p is None else self.keys[best_p]
+
+    def radius(self, pos, r):
+        """Gets the keys of all points within distance r.
+
+        Parameters
+        ----------
+        pos : float 2-tuple
+            x,y position to search around
+        r : float
+            search radius
+        """
+
+        if not len(self):
+            return []
+
+        x, y = float(pos[0]), float(pos[1])
+        (i0, j0), (i1, j1) = self._cell_of(x - r, y - r), self._cell_of(x + r, y + r)
+        xs, ys = self.xs, self.ys
+        r2 = r * r
+        keys = []
+        for i in range(max(i0, self.lo[0]), min(i1, self.hi[0]) + 1):
+            for j in range(max(j0, self.lo[1]), min(j1, self.hi[1]) + 1):
+                for p in self.cells.get((i << 32) + j, ()):
+                    if (xs[p] - x)**2 + (ys[p] - y)**2 <= r2:
+                        keys.append(self.keys[p])
+        return keys
@@ -0,0 +1,140 @@
+import numpy as np
+
+
+class Tree():
+    """Struct-of-arrays storage for a tree of 2D positions rooted at node 0.
+
+    Node ids are row indices into preallocated arrays, which double in
+    capacity when full, so adding a node is amortized O(1) and a node costs
+    32 bytes however large the tree grows. Ids are 0-based, the csv output
+    and printouts number nodes from 1.
+
+    ...
+
+    Attributes
+    ----------
+    pos : float64 Nx2 array
+        x,y position of each node
+    parent : int64 array
+        row of each node's parent, -1 for the root
+    cost : float64 array
+        path length from the root to each node through its parents
+
+    Methods
+    -------
+    add(pos, parent)
+        adds a node and returns its id
+    path(id_)
+        gets the ids from the root to a node
+    edges()
+        gets every (parent, child, length) edge
+    """
+
+    def __init__(self, root, capacity=1024):
+        """
+        Parameters
+        ----------
+        root : float 2-tuple
+            x,y position of the root node
+        capacity : int
+            number of nodes to allocate room for up front
+        """
+
+        self._pos = np.empty((capacity, 2))
+        self._parent = np.empty(capacity, dtype=np.int64)
+        self._cost = np.empty(capacity)
+        self.n = 0
+        self.add(root, -1)
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def pos(self):
+        return self._pos[:self.n]
+
+    @property
+    def parent(self):
+        return self._parent[:self.n]
+
+    @property
+    def cost(self):
+        return self._cost[:self.n]
+
+    def _grow(self):
+        """Doubles the capacity of every array"""
+        capacity = 2 * len(self._parent)
+        for name in ('_pos', '_parent', '_cost'):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def add(self, pos, parent):
+        """Adds a node.
+
+        Parameters
+        ----------
+        pos : float 2-tuple
+            x,y position of the node
+        parent : int
+            id of the parent node, -1 for the root
+
+        Returns
+        -------
+        id_ : int
+            id of the new node
+        """
+
+        if self.n == len(self._parent):
+            self._grow()
+
+        id_ = self.n
+        x, y = float(pos[0]), float(pos[1])
+        self._pos[id_] = x, y
+        self._parent[id_] = parent
+        if parent < 0:
+            self._cost[id_] = 0.0
+        else:
+            px, py = self._pos[parent]
+            self._cost[id_] = self._cost[parent] + ((x - px)**2 + (y - py)**2)**0.5
+        self.n += 1
+        return id_
+
+    def path(self, id_):
+        """Gets the ids from the root to a node by following parents.
+
+        Parameters
+        ----------
+        id_ : int
+            id of the last node in the path
+
+        Returns
+        -------
+        path : list of int
+            ids from the root to id_
+        """
+
+        path = []
+        parent = self._parent
+        while id_ >= 0:
+            path.append(id_)
+            id_ = int(parent[id_])
+        path.reverse()
+        return path
+
+    def edges(self):
+        """Gets every edge between a node and its parent, nodes without a parent have none.
+
+        Returns
+        -------
+        parent, child : int64 arrays
+            ids at both ends of each edge
+        length : float64 array
+            euclidean length of each edge
+        """
+
+        child = np.flatnonzero(self.parent >= 0)
+        parent = self.parent[child]
+        length = np.hypot(*(self.pos[child] - self.pos[parent]).T)
+        return parent, child, length